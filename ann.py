@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+
+from neighbors import save_npy, top_k_from_row
+
+# --------------------------------------------------
+# APPROXIMATE NEAREST NEIGHBORS: RANDOM-PROJECTION LSH
+# --------------------------------------------------
+# For catalogs too large for an exact all-pairs neighbor table.
+# Each of n_tables hash tables projects the L2-normalised vectors onto
+# n_bits random hyperplanes; the sign pattern is the bucket code. Similar
+# movies (small cosine angle) tend to share buckets. A query gathers the
+# movies in its own bucket of every table, plus n_probes neighbouring
+# buckets (its least confident bits flipped), and scores only those
+# candidates exactly.
+#
+# Recall / latency knobs at query time:
+#   n_tables        tables consulted (<= tables built)
+#   n_probes        extra buckets per table
+#   max_candidates  cap on exactly-scored candidates
+#
+# The index arrays are saved as separate .npy files and memory-mapped,
+# like the neighbor table, so Streamlit workers share one copy.
+
+LSH_FILES = {
+    "planes": "ann_lsh_planes.npy",
+    "order": "ann_lsh_order.npy",
+    "offsets": "ann_lsh_offsets.npy",
+}
+
+DEFAULT_TABLES = 32
+DEFAULT_PROBES = 2
+DEFAULT_MAX_CANDIDATES = 5000
+
+# Sparse TF-IDF neighbors sit at fairly wide angles, so each table uses few
+# bits (large buckets) and recall comes from the number of tables.
+TARGET_BUCKET_SIZE = 1024
+MAX_BITS = 16  # bucket offsets per table: 2^bits int32
+
+
+def default_bits(n_rows):
+    return int(np.clip(np.log2(max(n_rows, 2) / TARGET_BUCKET_SIZE), 4, MAX_BITS))
+
+
+def _dense(matrix):
+    return matrix.toarray() if sp.issparse(matrix) else np.asarray(matrix)
+
+
+class LSHIndex:
+    def __init__(self, planes, order, offsets):
+        self.planes = planes    # (tables, dim, bits) float32
+        self.order = order      # (tables, N) int32 rows grouped by bucket
+        self.offsets = offsets  # (tables, 2^bits + 1) bucket b = order[offsets[b]:offsets[b+1]]
+        self.weights = 1 << np.arange(planes.shape[2], dtype=np.int64)
+
+    @classmethod
+    def build(cls, vectors, n_tables=DEFAULT_TABLES, n_bits=None, seed=0):
+        n_rows, dim = vectors.shape
+        n_bits = min(n_bits or default_bits(n_rows), MAX_BITS)
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((n_tables, dim, n_bits)).astype(np.float32)
+
+        order = np.empty((n_tables, n_rows), dtype=np.int32)
+        offsets = np.zeros((n_tables, (1 << n_bits) + 1), dtype=np.int32)
+        weights = 1 << np.arange(n_bits, dtype=np.int64)
+
+        for t in range(n_tables):
+            codes = (_dense(vectors @ planes[t]) > 0) @ weights
+            order[t] = np.argsort(codes, kind="stable")
+            offsets[t, 1:] = np.cumsum(np.bincount(codes, minlength=1 << n_bits))
+
+        return cls(planes, order, offsets)
+
+    def save(self, model_dir):
+        for part, name in LSH_FILES.items():
+            save_npy(os.path.join(model_dir, name), getattr(self, part))
+
+    @classmethod
+    def load(cls, model_dir, mmap=True):
+        mode = "r" if mmap else None
+        arrays = {
+            part: np.load(os.path.join(model_dir, name), mmap_mode=mode)
+            for part, name in LSH_FILES.items()
+        }
+        return cls(**arrays)
+
+    def candidates(
+        self,
+        query,
+        n_tables=DEFAULT_TABLES,
+        n_probes=DEFAULT_PROBES,
+        max_candidates=DEFAULT_MAX_CANDIDATES,
+    ):
+        # rows sharing a bucket with `query` (a 1 x dim vector), most
+        # frequently co-bucketed first when the cap is hit
+        found = []
+        n_tables = min(n_tables, self.planes.shape[0])
+
+        for t in range(n_tables):
+            projection = _dense(query @ self.planes[t]).ravel()
+            code = int((projection > 0) @ self.weights)
+
+            probes = [code]
+            for bit in np.argsort(np.abs(projection))[:n_probes]:
+                probes.append(code ^ (1 << int(bit)))
+
+            offsets = self.offsets[t]
+            for probe in probes:
+                found.append(self.order[t][offsets[probe]:offsets[probe + 1]])
+
+        if not found:
+            return np.empty(0, dtype=np.int32)
+
+        rows, counts = np.unique(np.concatenate(found), return_counts=True)
+        if len(rows) > max_candidates:
+            rows = rows[np.argsort(-counts, kind="stable")[:max_candidates]]
+        return rows
+
+    def query(self, vectors, row, k, **search):
+        # best-first (indices, scores) of the approximate top-k for `row`
+        query = vectors[row:row + 1]
+        candidates = self.candidates(query, **search)
+        candidates = candidates[candidates != row]
+        if len(candidates) == 0:
+            return candidates.astype(np.int32), np.empty(0, dtype=np.float32)
+
+        scores = _dense(vectors[candidates] @ query.T).ravel().astype(np.float32)
+        best = top_k_from_row(scores, k)
+        return candidates[best].astype(np.int32), scores[best]
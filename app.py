@@ -1,37 +1,54 @@
 import streamlit as st
 import pandas as pd
-import pickle
-import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
 import os
-import ast
-
-movies = pickle.load(open("model_files/movie_list.pkl", "rb"))
-similarity = pickle.load(open("model_files/similarity.pkl", "rb"))
-
-def extract_genres(genres_str):
-    try:
-        return [g["name"] for g in ast.literal_eval(genres_str)]
-    except:
-        return []
+import uuid
+
+from ann import DEFAULT_TABLES, DEFAULT_PROBES, DEFAULT_MAX_CANDIDATES
+from browse_index import SORT_ORDERS
+from image_proxy import image_url
+from model_registry import ModelRegistry
+from trending import TrendingService
+from recommendation_cache import (
+    RecommendationStore,
+    build_records,
+    candidate_ids,
+    candidates_digest,
+)
+from tmdb_client import (
+    TMDBClient,
+    TMDBCache,
+    Prefetcher,
+    PREFETCH_PER_OWNER,
+    set_render_deadline,
+    poster_path_from_bundle,
+    trailer_key_from_bundle,
+)
 
-# Create genre list column
-movies["genre_list"] = movies["genres"].apply(extract_genres)
-
-# Languages - currently available
-language_map = {
-    "en": "English",
-    "hi": "Hindi",
-    "te": "Telugu",
-    "ta": "Tamil",
-    "ml": "Malayalam",
-    "kn": "Kannada",
+# Artifacts are loaded once per process and hot-swapped in the background
+# when rebuild_model.py writes a new manifest. Each script run takes one
+# snapshot so a render never mixes two model versions.
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry("model_files")
+
+model = get_model_registry().current()
+
+movies = model.movies
+genre_names = model.genre_names
+title_codes = model.title_codes
+movie_ids = model.movie_ids
+title_to_id = model.title_to_id
+id_to_row = model.id_to_row
+
+# Recall / latency knobs for a model built with --backend lsh (ignored by
+# the exact backend). More tables, probes and candidates find more of the
+# true neighbors at the cost of scoring more rows per recommendation.
+ANN_SEARCH = {
+    "n_tables": DEFAULT_TABLES,
+    "n_probes": DEFAULT_PROBES,
+    "max_candidates": DEFAULT_MAX_CANDIDATES,
 }
 
-movies["language_name"] = movies["original_language"].map(language_map).fillna("Other")
-
-
 # ------------------------------
 # Page Configuration
 # ---------------------------------
@@ -158,17 +175,23 @@ st.markdown("""
 # Session State Initialization
 # ------------------------------
 if "history" not in st.session_state:
-    st.session_state.history = []  # Stores movie_title of recently viewed movies
+    st.session_state.history = []  # (title, TMDB id) of recently viewed movies
 if "mode" not in st.session_state:
     st.session_state.mode = None
 if "selected_movie" not in st.session_state:
     st.session_state.selected_movie = None
+    st.session_state.selected_movie_id = None
 if "random_movie" not in st.session_state:
     st.session_state.random_movie = None
 if "favourites" not in st.session_state:
-    st.session_state.favourites = []
+    st.session_state.favourites = []  # (title, TMDB id), like history
 if "grid_locked" not in st.session_state:
     st.session_state.grid_locked = False
+if "genre_page" not in st.session_state:
+    st.session_state.genre_page = 0
+    st.session_state.genre_page_filters = None
+if "prefetch_owner" not in st.session_state:
+    st.session_state.prefetch_owner = uuid.uuid4().hex
 
 
 # ------------------------------
@@ -176,44 +199,65 @@ if "grid_locked" not in st.session_state:
 # ------------------------------
 TMDB_API_KEY = st.secrets["tmdb"]["api_key"]
 
-def requests_retry_session(
-    retries=5,
-    backoff_factor=1,
-    status_forcelist=(500, 502, 504),
-    session=None,
-):
-    session = session or requests.Session()
-    retry = Retry(
-        total=retries,
-        read=retries,
-        connect=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
+# one client (and one handle on the shared on-disk cache) per process
+@st.cache_resource
+def get_tmdb_client(api_key):
+    return TMDBClient(api_key, cache=TMDBCache())
+
+tmdb = get_tmdb_client(TMDB_API_KEY)
+
+# ready-made recommendation cards written by recommendation_cache.py
+@st.cache_resource
+def get_recommendation_store():
+    return RecommendationStore()
 
-def fetch_poster(movie_title):
+recommendation_store = get_recommendation_store()
+
+# warms the TMDB cache for likely next clicks between renders
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(tmdb)
+
+prefetcher = get_prefetcher()
+
+# trending list refreshed on a schedule in the background (trending.py)
+@st.cache_resource
+def get_trending_service():
+    return TrendingService(tmdb).start()
+
+trending = get_trending_service()
+
+# a new run means the user moved on: drop what the last page queued
+prefetcher.cancel(st.session_state.prefetch_owner)
+# ids this page's likely next clicks open, prefetched once it has rendered
+next_genre_ids = []
+recommended_ids = []
+
+# bound the total TMDB time this script run may spend
+set_render_deadline()
+
+# Every per-movie helper below reads the same cached "movie bundle"
+# (details, credits, videos, watch/providers and images from a single
+# append_to_response request), so a details page costs one TMDB call.
+
+# Posters are requested at the size of the slot they fill (see image_proxy.py)
+def poster_from_bundle(data, variant="card"):
     try:
-        url = f"https://api.themoviedb.org/3/search/movie?api_key={TMDB_API_KEY}&query={movie_title}"
-        data = requests_retry_session().get(url).json()
-        if data.get("results"):
-            poster_path = data["results"][0].get("poster_path")
-            if poster_path:
-                return "https://image.tmdb.org/t/p/w500/" + poster_path
+        return image_url(poster_path_from_bundle(data), variant)
     except Exception as e:
         print("POSTER ERROR:", e)
     return None
 
 
+def fetch_poster(movie_id, variant="detail"):
+    return poster_from_bundle(tmdb.movie_bundle(movie_id), variant)
+
+
 def fetch_watch_providers(movie_id, region="IN"):
     try:
-        url = f"https://api.themoviedb.org/3/movie/{movie_id}/watch/providers?api_key={TMDB_API_KEY}"
-        data = requests_retry_session().get(url).json()
+        data = tmdb.movie_bundle(movie_id) or {}
 
-        providers = data.get("results", {}).get(region, {})
+        providers = data.get("watch/providers", {}).get("results", {}).get(region, {})
         flatrate = providers.get("flatrate", [])
 
         return [p["provider_name"] for p in flatrate]
@@ -223,8 +267,16 @@ def fetch_watch_providers(movie_id, region="IN"):
         return []
 
 
+def select_movie(movie_title, movie_id=None):
+    # movie_id pins one of several movies sharing a title; without it the
+    # title's first catalog row is shown
+    st.session_state.mode = "search"
+    st.session_state.selected_movie = movie_title
+    st.session_state.selected_movie_id = movie_id
+
+
 # helper function for clickable movie cards
-def movie_card(movie_title, poster_url, key_prefix):
+def movie_card(movie_title, poster_url, key_prefix, movie_id=None):
     with st.container():
         if poster_url:
             st.image(poster_url, use_container_width=True)
@@ -235,71 +287,35 @@ def movie_card(movie_title, poster_url, key_prefix):
             key=f"{key_prefix}_{movie_title}",
             use_container_width=True
         ):
-            st.session_state.mode = "search"
-            st.session_state.selected_movie = movie_title
-           # st.session_state.select_movie = movie_title  # sync dropdown
-
+            select_movie(movie_title, movie_id)
 
 
-def fetch_trailer(movie_title):
-    try:
-        # Step 1: search by title to get movie ID
-        search_url = f"https://api.themoviedb.org/3/search/movie?api_key={TMDB_API_KEY}&query={movie_title}"
-        search_resp = requests_retry_session().get(search_url)
-        if search_resp.status_code != 200:
-            return None
 
-        search_data = search_resp.json()
-        if not search_data.get("results"):
-            return None
+def youtube_url(trailer_key):
+    return f"https://youtu.be/{trailer_key}" if trailer_key else None
 
-        movie_id = search_data["results"][0]["id"]
 
-        # Step 2: fetch videos using ID
-        video_url = f"https://api.themoviedb.org/3/movie/{movie_id}/videos?api_key={TMDB_API_KEY}"
-        response = requests_retry_session().get(video_url)
-
-        if response.status_code == 200:
-            for video in response.json().get("results", []):
-                if video.get("type") == "Trailer" and video.get("site") == "YouTube":
-                    return f"https://youtu.be/{video['key']}"
+def trailer_from_bundle(data):
+    try:
+        return youtube_url(trailer_key_from_bundle(data))
     except Exception as e:
         print("TRAILER ERROR:", e)
     return None
 
 
+def fetch_trailer(movie_id):
+    return trailer_from_bundle(tmdb.movie_bundle(movie_id))
 
-def get_movie_details(movie_title):
-    try:
-        # STEP 1: Search movie by title
-        search_url = (
-            f"https://api.themoviedb.org/3/search/movie"
-            f"?api_key={TMDB_API_KEY}&query={movie_title}"
-        )
-        search_resp = requests_retry_session().get(search_url)
 
-        if search_resp.status_code != 200:
-            return None
 
-        search_data = search_resp.json()
-        if not search_data.get("results"):
-            return None
-
-        movie_id = search_data["results"][0]["id"]
-
-        # STEP 2: Fetch movie details using ID
-        details_url = (
-            f"https://api.themoviedb.org/3/movie/{movie_id}"
-            f"?api_key={TMDB_API_KEY}&append_to_response=credits,videos"
-        )
-        response = requests_retry_session().get(details_url)
+def get_movie_details(movie_id, movie_title):
+    try:
+        data = tmdb.movie_bundle(movie_id)
         watch_providers = fetch_watch_providers(movie_id)
 
-        if response.status_code != 200:
+        if data is None:
             return None
 
-        data = response.json()
-
         # Directors
         directors = [
             crew["name"]
@@ -313,14 +329,11 @@ def get_movie_details(movie_title):
             cast_details.append({
                 "name": actor.get("name"),
                 "character": actor.get("character"),
-                "profile": (
-                    f"https://image.tmdb.org/t/p/w500{actor['profile_path']}"
-                    if actor.get("profile_path") else None
-                )
+                "profile": image_url(actor.get("profile_path"), "cast")
             })
         if st.button("❤️ Add to Favourites"):
-            if movie_title not in st.session_state.favourites:
-                st.session_state.favourites.append(movie_title)
+            if (movie_title, movie_id) not in st.session_state.favourites:
+                st.session_state.favourites.append((movie_title, movie_id))
                 st.success("Added to favourites!")
 
         return {
@@ -347,92 +360,63 @@ def get_movie_details(movie_title):
     return None
 
 
-def recommend(movie):
-    width=300
-    index = movies[movies["title"] == movie].index[0]
-    distances = sorted(
-        list(enumerate(similarity[index])),
-        reverse=True,
-        key=lambda x: x[1]
-    )
-
-    recommendations = []
-    seen_titles = set()
-
-    for i, score in distances:
-        rec_movie_title = movies.iloc[i]["title"]
-
-        if rec_movie_title == movie:
-            continue
-        if rec_movie_title in seen_titles:
-            continue
-
-        poster = fetch_poster(rec_movie_title)
-        if not poster:
-            continue
-        recommendations.append({
-            "title": rec_movie_title,
-            "poster": poster,
-            "trailer": fetch_trailer(rec_movie_title)
-        })
-
-        seen_titles.add(rec_movie_title)
-
-        if len(recommendations) == 5:
-            break
-
-    return recommendations
+def recommend(movie_id):
+    records = recommendation_store.get(movie_id, model.version)
+
+    if records is None:
+        # Cache miss: best-first candidates (precomputed by rebuild_model.py,
+        # or an ANN query), fetched concurrently a few ahead of the one being
+        # checked. A complete result is stored for the next visitor.
+        candidates = candidate_ids(model, id_to_row[movie_id], **ANN_SEARCH)
+        records, complete = build_records(model, tmdb, candidates)
+        if complete:
+            recommendation_store.put(movie_id, model.version, candidates_digest(candidates), records)
+
+    return [
+        {
+            "id": rec_movie_id,
+            "title": title,
+            "poster": image_url(poster_path, "card"),
+            "trailer": youtube_url(trailer_key),
+        }
+        for rec_movie_id, title, poster_path, trailer_key in records
+    ]
 
 def get_random_movie():
     random_movie = movies.sample(1).iloc[0]
     title = random_movie["title"]
+    movie_id = int(random_movie["id"])
 
     return {
+        "id": movie_id,
         "title": title,
-        "poster": fetch_poster(title),
-        "trailer": fetch_trailer(title),
+        "poster": fetch_poster(movie_id),
+        "trailer": fetch_trailer(movie_id),
         "movie_title": title   # keep key name if UI expects it
     }
 
 
 
 
-def update_history(movie_title):
-    if not st.session_state.history or st.session_state.history[-1] != movie_title:
-        st.session_state.history.append(movie_title)
+def update_history(movie_title, movie_id):
+    # the id tells apart movies that share a title
+    entry = (movie_title, movie_id)
+    if not st.session_state.history or st.session_state.history[-1] != entry:
+        st.session_state.history.append(entry)
         if len(st.session_state.history) > 5:
             st.session_state.history.pop(0)
 
 
 def get_trending_movies():
-    try:
-        url = f"https://api.themoviedb.org/3/trending/movie/week?api_key={TMDB_API_KEY}"
-        response = requests_retry_session().get(url)
-
-        if response.status_code == 200:
-            data = response.json()
-            trending = data.get("results", [])[:5]
-            trending_list = []
-
-            for movie in trending:
-                title = movie.get("title")
-
-                trending_list.append({
-                    "title": title,
-                    "poster": (
-                        f"https://image.tmdb.org/t/p/w500{movie.get('poster_path')}"
-                        if movie.get("poster_path") else None
-                    ),
-                    "movie_title": title   # TITLE, not ID
-                })
-
-            return trending_list
-
-        return []
-
-    except Exception as e:
-        print("TRENDING ERROR:", e)
-        return []
+    # read from the local snapshot; TMDB is only called by its refresh thread
+    return [
+        {
+            "title": movie["title"],
+            "poster": image_url(movie.get("poster_path"), "card"),
+            "movie_title": movie["title"]   # TITLE, not ID
+        }
+        for movie in trending.movies(limit=5)
+    ]
 
 # ------------------------------
 # Load Data
@@ -507,6 +491,9 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 trending_movies = get_trending_movies()
+if not trending_movies:
+    # only before the very first snapshot has been fetched
+    st.caption("Trending movies are on their way...")
 trending_cols = st.columns(5)
 for idx, movie in enumerate(trending_movies):
     with trending_cols[idx]:
@@ -514,7 +501,7 @@ for idx, movie in enumerate(trending_movies):
         movie_card(
             movie_title=movie["title"],
             poster_url=movie["poster"],
-            key_prefix="rec"
+            key_prefix="trending"
         )
 
             
@@ -532,9 +519,7 @@ st.markdown("---")
 # ------------------------------
 st.markdown("### 🎞️ Browse by Genre or Language 🌍")
 
-all_genres = sorted(
-    {genre for genres in movies["genre_list"] for genre in genres}
-)
+all_genres = genre_names
 
 selected_genre = st.selectbox(
     "Choose a genre 👇",
@@ -542,14 +527,10 @@ selected_genre = st.selectbox(
     key="genre_select"
 )
 
-if selected_genre == "All":
-    available_languages = sorted(movies["language_name"].unique())
-else:
-    available_languages = sorted(
-        movies[
-            movies["genre_list"].apply(lambda g: selected_genre in g)
-        ]["language_name"].unique()
-    )
+# filters run on the prebuilt genre x language index ("All" == None)
+genre_key = None if selected_genre == "All" else selected_genre
+
+available_languages = model.browse.languages(genre_key)
 
 
 selected_language = st.selectbox(
@@ -558,21 +539,37 @@ selected_language = st.selectbox(
     key="genre_language_select"
 )
 
+selected_sort = st.selectbox(
+    "Sort by 👇",
+    SORT_ORDERS,
+    key="genre_sort_select"
+)
+
 # -------- Filter movies --------
-if selected_genre == "All":
-    genre_filtered = movies.copy()
-else:
-    genre_filtered = movies[
-        movies["genre_list"].apply(lambda g: selected_genre in g)
-    ]
+language_key = None if selected_language == "All" else selected_language
 
-genre_filtered = genre_filtered.drop_duplicates(subset="title")
+# ordered, one row per title, cached per (genre, language, sort)
+genre_rows = model.browse.ordered(genre_key, language_key, selected_sort)
 
-if selected_language != "All":
-    genre_filtered = genre_filtered[
-        genre_filtered["language_name"] == selected_language
-    ]
-genre_movies = genre_filtered.head(5)
+GENRE_PAGE_SIZE = 10
+page_count = max(1, -(-len(genre_rows) // GENRE_PAGE_SIZE))
+
+# back to the first page whenever the filters change
+filters = (genre_key, language_key, selected_sort, model.version)
+if st.session_state.genre_page_filters != filters:
+    st.session_state.genre_page_filters = filters
+    st.session_state.genre_page = 0
+page = min(st.session_state.genre_page, page_count - 1)
+
+def genre_page_rows(page):
+    return genre_rows[page * GENRE_PAGE_SIZE:(page + 1) * GENRE_PAGE_SIZE]
+
+genre_movies = movies.iloc[genre_page_rows(page)]
+genre_bundles = tmdb.fetch_bundles(genre_movies["id"])
+
+# the next page is prefetched after this run renders
+if page + 1 < page_count:
+    next_genre_ids = movie_ids[genre_page_rows(page + 1)].tolist()
 
 # 🔧 CHANGE 2: proper 2 × 5 grid (no gaps)
 for row_start in range(0, len(genre_movies), 5):
@@ -582,7 +579,7 @@ for row_start in range(0, len(genre_movies), 5):
         genre_movies.iloc[row_start:row_start + 5].itertuples()
     ):
         with genre_cols[col_idx]:
-            poster = fetch_poster(row.title)
+            poster = poster_from_bundle(genre_bundles[row.id])
 
             # 🔧 CHANGE 3: keep space if poster missing
             if poster:
@@ -594,18 +591,44 @@ for row_start in range(0, len(genre_movies), 5):
                 )
 
             if st.button(row.title, key=f"genre_{row.id}"):
-                st.session_state.mode = "search"
-                st.session_state.selected_movie = row.title
-                st.session_state.select_movie = row.title
+                select_movie(row.title, int(row.id))
+
+def change_genre_page(step):
+    st.session_state.genre_page = page + step
+
+col_prev, col_page, col_next = st.columns([1, 3, 1])
+with col_prev:
+    st.button("⬅️ Previous", key="genre_prev", disabled=page == 0,
+              on_click=change_genre_page, args=(-1,))
+with col_page:
+    st.caption(f"Page {page + 1} of {page_count} · {len(genre_rows)} movies")
+with col_next:
+    st.button("Next ➡️", key="genre_next", disabled=page + 1 >= page_count,
+              on_click=change_genre_page, args=(1,))
 
 col_search, col_spacer, col_surprise = st.columns([3, 1, 2])
 
 with col_search:
     st.subheader("🔍 Search a Movie")
-    selected_movie = st.selectbox("Type to search...👇🏻", movies["title"].values, key="select_movie", help="Start typing to find your movie")
-    if st.button("Show Details & Recommendations", key="show_details"):
-        st.session_state.mode = "search"
-        st.session_state.selected_movie = selected_movie
+    # only the current query's matches are sent to the browser
+    query = st.text_input(
+        "Type to search...👇🏻",
+        key="search_query",
+        help="Start typing to find your movie; typos are fine",
+        # a new query starts again from its best match
+        on_change=lambda: st.session_state.pop("select_movie", None),
+    )
+    matches = model.search.search(query).tolist() if query else []
+    selected_row = st.selectbox(
+        "Matches",
+        matches,
+        format_func=model.search.label,
+        key="select_movie",
+        label_visibility="collapsed",
+        placeholder="No matching movies" if query else "Matches appear here",
+    )
+    if st.button("Show Details & Recommendations", key="show_details") and selected_row is not None:
+        select_movie(movies.iloc[selected_row]["title"], int(movie_ids[selected_row]))
 
 with col_surprise:
     st.subheader("🎁 Let the Model Decide!")
@@ -621,18 +644,14 @@ st.markdown("<br>", unsafe_allow_html=True)
 if "mode" in st.session_state and st.session_state.mode:
     if st.session_state.mode == "search":
         movie_title = st.session_state.selected_movie
-        #movie_row = movies[movies["title"] == movie_title].iloc[0]
-        matched = movies[movies["title"] == movie_title]
-
-        if matched.empty:
+        movie_id = st.session_state.selected_movie_id or title_to_id.get(movie_title)
+        if movie_id not in id_to_row:
             st.error("⚠️ This movie is not available in the recommendation dataset.")
             st.stop()
 
-        movie_row = matched.iloc[0]
-
-        update_history(movie_title)
-        details = get_movie_details(movie_title)
-        trailer_url = fetch_trailer(movie_title)
+        update_history(movie_title, movie_id)
+        details = get_movie_details(movie_id, movie_title)
+        trailer_url = fetch_trailer(movie_id)
 
         st.markdown("<div style='border-top: 2px solid #eee; margin: 2rem 0;'></div>", unsafe_allow_html=True)
         # Highlighting the movie name in red using HTML inside the markdown
@@ -641,7 +660,7 @@ if "mode" in st.session_state and st.session_state.mode:
         # Display poster and details side-by-side
         detail_col_left, detail_col_right = st.columns([1, 2])
         with detail_col_left:
-            poster = fetch_poster(movie_title)
+            poster = fetch_poster(movie_id)
             if poster:
                 st.image(poster, use_container_width=True)
         with detail_col_right:
@@ -714,7 +733,8 @@ if "mode" in st.session_state and st.session_state.mode:
 
         # Display Recommendations
         with st.spinner("Fetching Recommendations..."):
-            recommendations = recommend(movie_title)
+            recommendations = recommend(movie_id)
+            recommended_ids = [rec["id"] for rec in recommendations]
         st.markdown("<div style='border-top: 2px solid #eee; margin: 2rem 0;'></div>", unsafe_allow_html=True)
         st.subheader("🚀 Recommended Movies")
         rec_cols = st.columns(5)
@@ -724,7 +744,8 @@ if "mode" in st.session_state and st.session_state.mode:
                 movie_card(
                     movie_title=rec["title"],
                     poster_url=rec["poster"],
-                    key_prefix="rec"
+                    key_prefix="rec",
+                    movie_id=rec["id"]
                 )
 
                 if rec.get("trailer"):
@@ -739,9 +760,10 @@ if "mode" in st.session_state and st.session_state.mode:
         if not movie_title:
             movie_row = movies[movies["title"] == movie_title].iloc[0]
             movie_title = movie_row.movie_title
-        update_history(movie_title)
-        details = get_movie_details(movie_title)
-        trailer_url = fetch_trailer(movie_title)
+        movie_id = random_data["id"]
+        update_history(movie_title, movie_id)
+        details = get_movie_details(movie_id, movie_title)
+        trailer_url = fetch_trailer(movie_id)
 
         st.markdown("<div style='border-top: 2px solid #eee; margin: 2rem 0;'></div>", unsafe_allow_html=True)
         # Highlighting the movie name in red using HTML inside the markdown
@@ -749,7 +771,7 @@ if "mode" in st.session_state and st.session_state.mode:
 
         detail_col_left, detail_col_right = st.columns([1, 2])
         with detail_col_left:
-            poster = fetch_poster(movie_title)
+            poster = fetch_poster(movie_id)
             if poster:
                 st.image(poster, use_container_width=True)
         with detail_col_right:
@@ -820,9 +842,12 @@ if "mode" in st.session_state and st.session_state.mode:
 
 with st.sidebar:
     st.header("🕒 Recently Viewed")
-    if st.session_state.history:
-        for i, hist_id in enumerate(reversed(st.session_state.history)):
-            hist_poster = fetch_poster(hist_id)
+    # a hot-swapped model may have dropped a movie viewed earlier
+    history = [entry for entry in st.session_state.history if entry[1] in id_to_row]
+    if history:
+        history_bundles = tmdb.fetch_bundles(hist_id for _, hist_id in history)
+        for i, (hist_title, hist_id) in enumerate(reversed(history)):
+            hist_poster = poster_from_bundle(history_bundles[hist_id], "sidebar")
             col_img, col_btn = st.columns([1, 3])
             with col_img:
                 if hist_poster:
@@ -830,23 +855,37 @@ with st.sidebar:
 
             with col_btn:
                 if st.button(
-                    hist_id,
+                    hist_title,
                     key=f"hist_{hist_id}_{i}",
                     use_container_width=True
                 ):
-                    st.session_state.mode = "search"
-                    st.session_state.selected_movie = hist_id
+                    select_movie(hist_title, hist_id)
                     st.rerun()
     else:
         st.caption("No watch history")
 with st.sidebar:
     st.header("❤️ Favourites")
     if st.session_state.favourites:
-        for fav in st.session_state.favourites:
-            if st.button(fav, key=f"fav_{fav}"):
-                st.session_state.mode = "search"
-                st.session_state.selected_movie = fav
-                st.session_state.select_movie = fav
+        for fav_title, fav_id in st.session_state.favourites:
+            if st.button(fav_title, key=f"fav_{fav_id}"):
+                select_movie(fav_title, fav_id)
                 st.rerun()
     else:
         st.write("No favourites yet")
+
+# ------------------------------
+# Prefetch likely next clicks
+# ------------------------------
+# best guesses first; everything is cancelled when the next run starts.
+# Recently Viewed and favourites only get the slots of the per-session
+# budget that the cards and the next genre page leave, so a long sidebar
+# never pushes the next page out of the queue.
+sidebar_ids = (
+    [movie_id for _, movie_id in reversed(st.session_state.history) if movie_id in id_to_row]
+    + [movie_id for _, movie_id in st.session_state.favourites if movie_id in id_to_row]
+)
+sidebar_slots = max(PREFETCH_PER_OWNER - len(recommended_ids) - len(next_genre_ids), 0)
+prefetcher.submit(
+    st.session_state.prefetch_owner,
+    recommended_ids + sidebar_ids[:sidebar_slots] + next_genre_ids,
+)
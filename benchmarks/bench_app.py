@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tmdb_stub import start_stub
+
+# --------------------------------------------------
+# END-TO-END APP LATENCY BENCHMARK
+# --------------------------------------------------
+# Drives app.py headlessly with Streamlit's AppTest against the local TMDB
+# stub and times one script run (render) per interaction:
+#   title_search  type a catalog title with one typo into the search box
+#   search        pick the first match, "Show Details & Recommendations"
+#                 (get_movie_details + recommend)
+#   rec_card      open the first recommendation card of that page
+#   surprise      "Surprise Me!" (get_random_movie + details + recommend)
+#   genre_filter  pick a genre in the browse section
+#   genre_next    next page of the genre grid
+# and reports p50/p95/p99, stub HTTP calls and response bytes per render.
+# Titles and genres are drawn at random, so the TMDB cache, the
+# recommendation store and the trending snapshot (fresh files per run)
+# start cold and warm up as the run goes on; --warm N first runs the
+# recommendation warm-up job for the N most popular movies (0 = whole
+# catalog).
+# --think-ms pauses before every interaction, like a user reading the
+# page, which is when the background prefetcher warms the next clicks.
+#
+# Needs built model_files (python rebuild_model.py); no network access.
+#
+#   python benchmarks/bench_app.py --iterations 50 --latency-ms 80 --error-rate 0.02
+
+INTERACTIONS = ["title_search", "search", "rec_card", "surprise", "genre_filter", "genre_next"]
+
+
+def title_search(at, rng):
+    title = rng.choice(TITLES)
+    if len(title) > 4:
+        # drop one character
+        cut = rng.randrange(1, len(title) - 1)
+        title = title[:cut] + title[cut + 1:]
+    at.text_input(key="search_query").input(title)
+
+
+def search(at, rng):
+    # the best match from title_search is preselected
+    at.button(key="show_details").click()
+
+
+def rec_card(at, rng):
+    cards = [button for button in at.button if (button.key or "").startswith("rec_")]
+    if cards:
+        cards[0].click()
+
+
+def surprise(at, rng):
+    at.button(key="surprise_me").click()
+
+
+def genre_filter(at, rng):
+    select = at.selectbox(key="genre_select")
+    select.select(rng.choice(select.options[1:]))
+
+
+def genre_next(at, rng):
+    next_button = at.button(key="genre_next")
+    if next_button.disabled:
+        genre_filter(at, rng)
+    else:
+        next_button.click()
+
+
+ACTIONS = {
+    "title_search": title_search,
+    "search": search,
+    "rec_card": rec_card,
+    "surprise": surprise,
+    "genre_filter": genre_filter,
+    "genre_next": genre_next,
+}
+
+
+def measure(at, server, action, rng, think=0.0):
+    # one render: returns (seconds, HTTP calls, response bytes, failed).
+    # Calls and bytes include background prefetches made during the render.
+    time.sleep(think)
+    before = server.requests_served, server.bytes_served
+    action(at, rng)
+
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+
+    return (
+        elapsed,
+        server.requests_served - before[0],
+        server.bytes_served - before[1],
+        len(at.exception) > 0,
+    )
+
+
+def summarize(samples):
+    seconds, calls, sent, failed = (np.array(column) for column in zip(*samples))
+    p50, p95, p99 = np.percentile(seconds * 1000, [50, 95, 99])
+    return {
+        "renders": len(samples),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "http_calls_per_render": round(float(calls.mean()), 2),
+        "kb_per_render": round(float(sent.mean()) / 1024, 2),
+        "failed_renders": int(failed.sum()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end app latency benchmark")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--think-ms", type=float, default=0, help="pause before each interaction")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm", type=int, default=None, help="precompute recommendations first")
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    server, base_url = start_stub(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    cache_dir = tempfile.mkdtemp(prefix="movimate_bench_")
+    os.environ["TMDB_BASE_URL"] = base_url
+    os.environ["TMDB_CACHE_PATH"] = os.path.join(cache_dir, "tmdb_cache.sqlite")
+    os.environ["RECOMMENDATION_CACHE_PATH"] = os.path.join(cache_dir, "recommendations.sqlite")
+    os.environ["TRENDING_PATH"] = os.path.join(cache_dir, "trending.json")
+
+    # app.py loads model_files relative to the working directory
+    os.chdir(ROOT)
+    # imported after the env vars above: these modules read their cache
+    # paths at import time, and app.py shares these module objects
+    from model_registry import load_artifacts
+    from tmdb_client import TMDBClient, TMDBCache
+    from recommendation_cache import RecommendationStore, popular_movie_ids, warm
+
+    model = load_artifacts("model_files")
+    TITLES = model.movies["title"].tolist()
+
+    if args.warm is not None:
+        warm(
+            model,
+            TMDBClient("bench", cache=TMDBCache()),
+            RecommendationStore(),
+            popular_movie_ids(model, args.warm or None),
+        )
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.secrets["tmdb"] = {"api_key": "bench"}
+
+    rng = random.Random(args.seed)
+    samples = {name: [] for name in ["first_render"] + INTERACTIONS}
+    samples["first_render"].append(measure(at, server, lambda at, rng: None, rng))
+
+    for _ in range(args.iterations):
+        for name in INTERACTIONS:
+            samples[name].append(measure(at, server, ACTIONS[name], rng, args.think_ms / 1000))
+
+    report = {
+        "stub": {
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+        },
+        "iterations": args.iterations,
+        "think_ms": args.think_ms,
+        "warm": args.warm,
+        "interactions": {name: summarize(s) for name, s in samples.items()},
+    }
+
+    print(f"stub latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, "
+          f"error rate {args.error_rate:.0%}, {args.iterations} iterations")
+    print(f"{'interaction':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'calls':>6} {'KB':>8} {'failed':>6}")
+    for name, row in report["interactions"].items():
+        print(f"{name:<14} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+              f"{row['http_calls_per_render']:>6.2f} {row['kb_per_render']:>8.2f} "
+              f"{row['failed_renders']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
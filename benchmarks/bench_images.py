@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tmdb_stub import start_stub
+from image_proxy import IMAGE_VARIANTS, ImageCache, start_proxy
+
+# --------------------------------------------------
+# IMAGE PROXY BENCHMARK
+# --------------------------------------------------
+# Downloads the images of one details page, the way a browser would:
+#   direct  every slot as a w500 TMDB URL (what the app used to send)
+#   cold    through image_proxy.py with an empty disk cache
+#   warm    the same page again, served from disk
+#   304     a revalidation with If-None-Match
+# and reports KB per page, per-image latency and how many times each image
+# was fetched from the (stub) TMDB image server. No network needed.
+#
+#   python benchmarks/bench_images.py --pages 20 --latency-ms 40
+
+# slots on a details page with the browse grid, trending row and sidebar
+PAGE_SLOTS = {"card": 20, "detail": 1, "cast": 5, "sidebar": 5}
+
+
+def page_images(page):
+    # distinct TMDB file names for every slot of one page
+    names = []
+    for variant, count in PAGE_SLOTS.items():
+        names += [(variant, f"poster_{page}_{variant}_{i}") for i in range(count)]
+    return names
+
+
+def fetch(session, url, headers=None):
+    start = time.perf_counter()
+    response = session.get(url, headers=headers)
+    return time.perf_counter() - start, response
+
+
+def percentiles(seconds):
+    p50, p95 = np.percentile(np.array(seconds) * 1000, [50, 95])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Image proxy benchmark")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    stub, base_url = start_stub(latency=args.latency_ms / 1000)
+    image_root = base_url.rsplit("/3", 1)[0] + "/t/p"
+    cache = ImageCache(tempfile.mkdtemp(prefix="movimate_images_"), source_url=image_root)
+    proxy, proxy_url = start_proxy(cache=cache)
+    session = requests.Session()
+
+    bytes_direct, bytes_proxy = [], []
+    timings = {"direct": [], "cold": [], "warm": [], "304": []}
+    for page in range(args.pages):
+        images = page_images(page)
+
+        sent = 0
+        for _, name in images:
+            seconds, response = fetch(session, f"{image_root}/w500/{name}.jpg")
+            timings["direct"].append(seconds)
+            sent += len(response.content)
+        bytes_direct.append(sent)
+
+        before = stub.requests_served
+        sent = 0
+        for variant, name in images:
+            seconds, response = fetch(session, f"{proxy_url}/{variant}/{name}.jpg")
+            timings["cold"].append(seconds)
+            sent += len(response.content)
+        bytes_proxy.append(sent)
+        source_fetches = stub.requests_served - before
+
+        for variant, name in images:
+            seconds, response = fetch(session, f"{proxy_url}/{variant}/{name}.jpg")
+            timings["warm"].append(seconds)
+            etag = response.headers["ETag"]
+            seconds, response = fetch(
+                session, f"{proxy_url}/{variant}/{name}.jpg", {"If-None-Match": etag}
+            )
+            assert response.status_code == 304
+            timings["304"].append(seconds)
+
+        assert source_fetches == len(images)
+
+    report = {
+        "pages": args.pages,
+        "images_per_page": sum(PAGE_SLOTS.values()),
+        "variant_widths": IMAGE_VARIANTS,
+        "kb_per_page_direct": round(float(np.mean(bytes_direct)) / 1024, 1),
+        "kb_per_page_proxy": round(float(np.mean(bytes_proxy)) / 1024, 1),
+        "latency": {name: percentiles(seconds) for name, seconds in timings.items()},
+        "cache_control": response.headers["Cache-Control"],
+    }
+    report["bytes_saved"] = round(1 - report["kb_per_page_proxy"] / report["kb_per_page_direct"], 3)
+
+    print(f"{report['images_per_page']} images per page, {args.pages} pages, "
+          f"stub latency {args.latency_ms:.0f} ms")
+    print(f"KB per page: direct w500 {report['kb_per_page_direct']:.1f}, "
+          f"proxy {report['kb_per_page_proxy']:.1f} ({report['bytes_saved']:.0%} less)")
+    for name, row in report["latency"].items():
+        print(f"  {name:<7} p50 {row['p50_ms']:>7.2f} ms   p95 {row['p95_ms']:>7.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
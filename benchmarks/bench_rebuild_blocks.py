@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --------------------------------------------------
+# BLOCKED REBUILD BENCHMARK: peak RSS and wall time
+# --------------------------------------------------
+# Builds the top-K neighbor index for a synthetic TF-IDF matrix (5000
+# features, ~40 non-zeros per row, like the real tags) once with the dense
+# cosine_similarity path and once per --block-size, each in a fresh
+# process so ru_maxrss is that run's own peak.
+#
+#   python benchmarks/bench_rebuild_blocks.py --movies 20000 --block-sizes 128 512 2048
+
+CHILD = """
+import sys, json, time, resource, tempfile
+sys.path.insert(0, {root!r})
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+from neighbors import build_neighbors_to_disk, top_k_rows
+
+n, block_size = {n}, {block_size}
+rng = np.random.default_rng(0)
+nnz = 40
+rows = np.repeat(np.arange(n), nnz)
+cols = rng.integers(0, 5000, size=n * nnz)
+vectors = normalize(sp.csr_matrix(
+    (rng.random(n * nnz, dtype=np.float32), (rows, cols)), shape=(n, 5000)
+))
+vectors.sum_duplicates()
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+start = time.perf_counter()
+with tempfile.TemporaryDirectory() as tmp:
+    if block_size:
+        build_neighbors_to_disk(tmp, vectors, k=50, block_size=block_size)
+    else:
+        from sklearn.metrics.pairwise import cosine_similarity
+        top_k_rows(cosine_similarity(vectors), k=50)
+elapsed = time.perf_counter() - start
+
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "peak_mb": peak / 1024, "input_mb": base_rss / 1024}}))
+"""
+
+
+def run(n, block_size):
+    code = CHILD.format(root=ROOT, n=n, block_size=block_size or 0)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        return None
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--movies", type=int, nargs="+", default=[20_000])
+parser.add_argument("--block-sizes", type=int, nargs="+", default=[128, 512, 2048])
+parser.add_argument("--skip-dense", action="store_true", help="skip the N x N baseline")
+args = parser.parse_args()
+
+print(f"{'movies':>8} {'mode':>12} {'wall (s)':>9} {'peak RSS (MB)':>14}")
+
+for n in args.movies:
+    modes = ([] if args.skip_dense else [None]) + args.block_sizes
+    for block_size in modes:
+        label = f"block {block_size}" if block_size else "dense"
+        result = run(n, block_size)
+        if result is None:
+            print(f"{n:>8} {label:>12} {'failed (likely OOM)':>24}")
+            continue
+        print(f"{n:>8} {label:>12} {result['seconds']:>9.2f} {result['peak_mb']:>14.0f}")
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from neighbors import build_neighbors_to_disk, INDICES_FILE, SCORES_FILE
+
+# --------------------------------------------------
+# PARALLEL REBUILD SCALING BENCHMARK
+# --------------------------------------------------
+# Runs the blocked neighbor build on a synthetic TF-IDF matrix with
+# 1/2/4/8/16 worker processes, reports throughput and checks that every
+# worker count produces byte-identical artifacts.
+#
+#   python benchmarks/bench_rebuild_workers.py --movies 50000
+
+
+def synthetic_vectors(n, nnz=40, features=5000):
+    rng = np.random.default_rng(0)
+    rows = np.repeat(np.arange(n), nnz)
+    cols = rng.integers(0, features, size=n * nnz)
+    vectors = sp.csr_matrix(
+        (rng.random(n * nnz, dtype=np.float32), (rows, cols)), shape=(n, features)
+    )
+    vectors.sum_duplicates()
+    return normalize(vectors)
+
+
+def digest(model_dir):
+    h = hashlib.sha256()
+    for name in (INDICES_FILE, SCORES_FILE):
+        with open(os.path.join(model_dir, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--movies", type=int, default=30_000)
+parser.add_argument("--block-size", type=int, default=512)
+parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+args = parser.parse_args()
+
+vectors = synthetic_vectors(args.movies)
+print(f"{args.movies} movies, block size {args.block_size}, {os.cpu_count()} CPUs")
+print(f"{'workers':>8} {'wall (s)':>9} {'movies/s':>9} {'speedup':>8} {'output':>13}")
+
+base = None
+for workers in args.workers:
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_neighbors_to_disk(tmp, vectors, k=50, block_size=args.block_size, workers=workers)
+        elapsed = time.perf_counter() - start
+        out = digest(tmp)
+
+    base = base or elapsed
+    print(f"{workers:>8} {elapsed:>9.2f} {args.movies / elapsed:>9.0f} {base / elapsed:>7.2f}x {out:>13}")
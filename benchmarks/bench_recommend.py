@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from neighbors import top_k_from_row, filter_candidates
+
+# --------------------------------------------------
+# MICROBENCHMARK: ranking one similarity row
+# --------------------------------------------------
+# Compares the original recommend() ranking (sorted() over Python tuples)
+# with the argpartition path on a synthetic catalog. Posters are not
+# fetched; only the candidate selection is timed.
+#
+#   python benchmarks/bench_recommend.py
+
+SIZES = [5_000, 50_000, 200_000]
+N_RESULTS = 5
+OVERFETCH = 50
+REPEATS = 20
+
+
+def recommend_sorted(row, titles, index):
+    distances = sorted(
+        list(enumerate(row)),
+        reverse=True,
+        key=lambda x: x[1]
+    )
+
+    recommendations = []
+    seen_titles = set()
+
+    for i, score in distances:
+        title = titles[i]
+        if title == titles[index] or title in seen_titles:
+            continue
+        recommendations.append(i)
+        seen_titles.add(title)
+        if len(recommendations) == N_RESULTS:
+            break
+
+    return recommendations
+
+
+def recommend_argpartition(row, title_codes, index):
+    candidates = top_k_from_row(row, OVERFETCH, exclude=index)
+    candidates = filter_candidates(candidates, title_codes, title_codes[index])
+    return candidates[:N_RESULTS].tolist()
+
+
+def time_call(fn, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+rng = np.random.default_rng(42)
+
+print(f"{'movies':>8} {'sorted (ms)':>12} {'argpartition (ms)':>18} {'speedup':>8}")
+
+for n in SIZES:
+    row = rng.random(n).astype(np.float32)
+    # ~2% duplicate titles, like remakes sharing a name
+    title_codes = rng.integers(0, int(n * 0.98), size=n)
+    titles = title_codes.tolist()
+    index = int(rng.integers(0, n))
+
+    assert recommend_sorted(row, titles, index) == recommend_argpartition(row, title_codes, index)
+
+    old = time_call(recommend_sorted, row, titles, index)
+    new = time_call(recommend_argpartition, row, title_codes, index)
+
+    print(f"{n:>8} {old * 1000:>12.2f} {new * 1000:>18.3f} {old / new:>7.0f}x")
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import pickle
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog import save_catalog
+
+# --------------------------------------------------
+# COLD-START BENCHMARK: app data loading
+# --------------------------------------------------
+# Times, in a fresh interpreter each run (after pandas/numpy are imported),
+# what app.py does before its first render: before = unpickle the full movie_list.pkl DataFrame, literal_eval
+# every genres string and map languages; after = load catalog.npz.
+# Uses a synthetic TMDB-shaped catalog so it runs without the dataset.
+#
+#   python benchmarks/bench_startup.py --movies 5000 50000
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary",
+          "Drama", "Family", "Fantasy", "History", "Horror", "Music", "Mystery",
+          "Romance", "Science Fiction", "Thriller", "War", "Western"]
+LANGUAGES = ["en", "en", "en", "hi", "te", "ta", "ml", "kn", "fr", "ja"]
+
+BEFORE = """
+import ast, pickle
+import pandas as pd
+
+movies = pickle.load(open({pkl!r}, "rb"))
+
+def extract_genres(genres_str):
+    try:
+        return [g["name"] for g in ast.literal_eval(genres_str)]
+    except:
+        return []
+
+movies["genre_list"] = movies["genres"].apply(extract_genres)
+language_map = {{"en": "English", "hi": "Hindi", "te": "Telugu",
+                 "ta": "Tamil", "ml": "Malayalam", "kn": "Kannada"}}
+movies["language_name"] = movies["original_language"].map(language_map).fillna("Other")
+"""
+
+AFTER = """
+import sys
+sys.path.insert(0, {root!r})
+from catalog import load_catalog
+
+movies, genre_names = load_catalog({npz!r})
+"""
+
+
+def synthetic_movies(n, rng):
+    words = [f"word{i}" for i in range(2000)]
+
+    def text(k):
+        return " ".join(rng.choice(words, size=k))
+
+    def genres():
+        picked = rng.choice(len(GENRES), size=rng.integers(1, 4), replace=False)
+        return json.dumps([{"id": int(i), "name": GENRES[i]} for i in picked])
+
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "title": [f"Movie {i}" for i in range(n)],
+        "overview": [text(60) for _ in range(n)],
+        "genres": [genres() for _ in range(n)],
+        "keywords": [text(20) for _ in range(n)],
+        "cast": [text(80) for _ in range(n)],
+        "crew": [text(120) for _ in range(n)],
+        "original_language": rng.choice(LANGUAGES, size=n),
+        "release_date": [f"{y}-01-01" for y in rng.integers(1950, 2024, size=n)],
+        "popularity": rng.exponential(10.0, size=n).round(3),
+        "vote_average": rng.uniform(1, 10, size=n).round(1),
+        "vote_count": rng.integers(0, 20000, size=n),
+        "tags": [text(100) for _ in range(n)],
+    })
+
+
+TIMED = """
+import time, numpy, pandas
+_start = time.perf_counter()
+{code}
+print(time.perf_counter() - _start)
+"""
+
+
+def cold_run(code, repeats):
+    # one untimed run first so the OS file cache is warm for every variant
+    code = TIMED.format(code=code)
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True, text=True
+        ).stdout
+        times.append(float(out.split()[-1]))
+    return float(np.median(times))
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--movies", type=int, nargs="+", default=[5_000, 50_000])
+parser.add_argument("--repeats", type=int, default=5)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+
+print(f"{'movies':>8} {'pickle (s)':>11} {'catalog (s)':>12} {'pkl MB':>8} {'npz MB':>8}")
+
+with tempfile.TemporaryDirectory() as tmp:
+    for n in args.movies:
+        df = synthetic_movies(n, rng)
+        pkl = os.path.join(tmp, "movie_list.pkl")
+        npz = os.path.join(tmp, "catalog.npz")
+
+        with open(pkl, "wb") as f:
+            pickle.dump(df, f)
+        save_catalog(npz, df)
+
+        before = cold_run(BEFORE.format(pkl=pkl), args.repeats)
+        after = cold_run(AFTER.format(root=ROOT, npz=npz), args.repeats)
+
+        print(
+            f"{n:>8} {before:>11.3f} {after:>12.3f} "
+            f"{os.path.getsize(pkl) / 1e6:>8.1f} {os.path.getsize(npz) / 1e6:>8.2f}"
+        )
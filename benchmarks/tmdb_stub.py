@@ -0,0 +1,181 @@
+import io
+import re
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from PIL import Image
+
+# --------------------------------------------------
+# LOCAL TMDB STUB SERVER
+# --------------------------------------------------
+# Serves deterministic fake payloads for the TMDB endpoints the app uses,
+# so the client and cache can be exercised without network access:
+#
+#   python benchmarks/tmdb_stub.py --port 8765
+#   TMDB_BASE_URL=http://127.0.0.1:8765/3 streamlit run app.py
+#
+# --latency-ms / --jitter-ms delay every response and --error-rate answers
+# that share of requests with a 503, to mimic a slow or flaky upstream.
+# Images are served TMDB-style too (/t/p/w342/poster_1.jpg; the image base
+# URL is the server root): deterministic poster-like JPEGs at that width.
+# The server counts requests, errors and response bytes it has sent.
+
+
+def fake_movie(movie_id):
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "poster_path": f"/poster_{movie_id}.jpg",
+        "vote_average": 7.0,
+        "vote_count": 1000,
+        "release_date": "2000-01-01",
+        "runtime": 120,
+        "tagline": "",
+        "overview": "",
+        "genres": [{"id": 18, "name": "Drama"}],
+        "budget": 0,
+        "revenue": 0,
+        "spoken_languages": [{"english_name": "English"}],
+    }
+
+
+def fake_videos(movie_id):
+    return {"results": [{"type": "Trailer", "site": "YouTube", "key": f"trailer{movie_id}"}]}
+
+
+def fake_providers(movie_id):
+    return {"results": {"IN": {"flatrate": [{"provider_name": "Stub Stream"}]}}}
+
+
+def fake_credits(movie_id):
+    return {
+        "cast": [{"name": f"Actor {i}", "character": f"Role {i}", "profile_path": None} for i in range(5)],
+        "crew": [{"name": "Stub Director", "job": "Director"}],
+    }
+
+
+@lru_cache(maxsize=256)
+def fake_image(size, name):
+    # 2:3 JPEG: blurred colour blocks plus fine grain, so it compresses
+    # roughly like a real poster; "original" is 1000px wide
+    width = int(size[1:]) if size[1:].isdigit() else 1000
+    height = width * 3 // 2
+    rng = np.random.default_rng(zlib.crc32(name.encode()))
+
+    blocks = Image.fromarray(rng.integers(0, 256, (12, 8, 3), dtype=np.uint8))
+    pixels = np.asarray(blocks.resize((width, height), Image.BICUBIC), dtype=np.int16)
+    pixels = pixels + rng.normal(0, 4, pixels.shape).astype(np.int16)
+
+    out = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def route(path, query):
+    # returns (status, payload)
+    if path == "/3/search/movie":
+        title = query.get("query", [""])[0]
+        movie_id = sum(title.encode()) or 1
+        return 200, {"results": [{**fake_movie(movie_id), "title": title}]}
+
+    if path == "/3/trending/movie/week":
+        return 200, {"results": [fake_movie(i) for i in range(1, 21)]}
+
+    match = re.fullmatch(r"/3/movie/(\d+)(/videos|/watch/providers)?", path)
+    if match:
+        movie_id, sub = int(match.group(1)), match.group(2)
+        if sub == "/videos":
+            return 200, fake_videos(movie_id)
+        if sub == "/watch/providers":
+            return 200, fake_providers(movie_id)
+
+        data = fake_movie(movie_id)
+        for part in query.get("append_to_response", [""])[0].split(","):
+            if part == "credits":
+                data["credits"] = fake_credits(movie_id)
+            elif part == "videos":
+                data["videos"] = fake_videos(movie_id)
+            elif part == "watch/providers":
+                data["watch/providers"] = fake_providers(movie_id)
+            elif part == "images":
+                data["images"] = {"posters": [{"file_path": f"/poster_{movie_id}.jpg"}]}
+        return 200, data
+
+    return 404, {"status_message": "not found"}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            delay = max(0.0, server.latency + server.rng.uniform(-server.jitter, server.jitter))
+            failed = server.rng.random() < server.error_rate
+        time.sleep(delay)
+
+        url = urlparse(self.path)
+        image = re.fullmatch(r"/t/p/(w\d+|original)/([\w-]+)\.(?:jpg|png)", url.path)
+        content_type = "application/json"
+        if failed:
+            status, body = 503, json.dumps({"status_message": "stub error"}).encode()
+        elif image:
+            status, body = 200, fake_image(image.group(1), image.group(2))
+            content_type = "image/jpeg"
+        else:
+            status, payload = route(url.path, parse_qs(url.query))
+            body = json.dumps(payload).encode()
+
+        with server.lock:
+            server.requests_served += 1
+            server.errors_served += failed
+            server.bytes_served += len(body)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+    # starts the stub in a daemon thread; port 0 picks a free port.
+    # latency / jitter in seconds, error_rate in [0, 1]
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.rng = random.Random(seed)
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.requests_served = 0
+    server.errors_served = 0
+    server.bytes_served = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/3"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local TMDB stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    server, base_url = start_stub(
+        args.port, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate
+    )
+    print("TMDB stub listening on", base_url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
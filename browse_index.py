@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from neighbors import filter_candidates
+
+# --------------------------------------------------
+# GENRE x LANGUAGE INVERTED INDEX
+# --------------------------------------------------
+# Built once per model version. Every genre and every language maps to a
+# sorted int32 array of catalog rows, so "Browse by Genre or Language"
+# is a posting-list intersection (O(result)) instead of a full scan of the
+# movies DataFrame with a Python lambda per row.
+#
+# Each sort order is stored as a rank per row; an ordered, title-deduped
+# result list is computed once per (genre, language, sort) and kept in a
+# small LRU, so paging through it is just slicing.
+
+SORT_ORDERS = ["Popularity", "Rating"]
+RESULT_CACHE_SIZE = 256
+
+
+def _ranks(order):
+    # order: rows best-first -> rank[row] = position in that order
+    ranks = np.empty(len(order), dtype=np.int32)
+    ranks[order] = np.arange(len(order), dtype=np.int32)
+    return ranks
+
+
+class BrowseIndex:
+    def __init__(
+        self,
+        genre_mask,
+        genre_names,
+        language_codes,
+        language_names,
+        title_codes,
+        sort_orders,
+    ):
+        genre_mask = np.asarray(genre_mask, dtype=np.uint64)
+        language_codes = np.asarray(language_codes)
+
+        self.all_rows = np.arange(len(genre_mask), dtype=np.int32)
+        self.title_codes = title_codes
+        self.ranks = {name: _ranks(order) for name, order in sort_orders.items()}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.by_genre = {
+            name: np.flatnonzero(genre_mask & np.uint64(1 << i)).astype(np.int32)
+            for i, name in enumerate(genre_names)
+        }
+        self.by_language = {
+            name: np.flatnonzero(language_codes == i).astype(np.int32)
+            for i, name in enumerate(language_names)
+        }
+
+        # languages offered in the dropdown, per genre
+        self.all_languages = sorted(
+            name for name, rows in self.by_language.items() if len(rows)
+        )
+        self.languages_by_genre = {
+            genre: sorted(language_names[c] for c in np.unique(language_codes[rows]))
+            for genre, rows in self.by_genre.items()
+        }
+
+    @classmethod
+    def from_movies(cls, movies, genre_names, title_codes):
+        languages = movies["language_name"].cat
+        popularity = movies["popularity"].to_numpy()
+        vote_average = movies["vote_average"].to_numpy()
+        vote_count = movies["vote_count"].to_numpy()
+
+        sort_orders = {
+            "Popularity": np.argsort(-popularity, kind="stable"),
+            # vote count breaks ties between equally rated movies
+            "Rating": np.lexsort((-vote_count, -vote_average)),
+        }
+        return cls(
+            movies["genre_mask"].to_numpy(),
+            genre_names,
+            languages.codes.to_numpy(),
+            list(languages.categories),
+            title_codes,
+            sort_orders,
+        )
+
+    def languages(self, genre=None):
+        if genre is None:
+            return self.all_languages
+        return self.languages_by_genre.get(genre, [])
+
+    def rows(self, genre=None, language=None):
+        # sorted catalog rows matching both filters; None means "All"
+        empty = np.empty(0, dtype=np.int32)
+        postings = []
+        if genre is not None:
+            postings.append(self.by_genre.get(genre, empty))
+        if language is not None:
+            postings.append(self.by_language.get(language, empty))
+
+        if not postings:
+            return self.all_rows
+
+        # intersect smallest first
+        postings.sort(key=len)
+        result = postings[0]
+        for other in postings[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def ordered(self, genre=None, language=None, sort=SORT_ORDERS[0]):
+        # matching rows in `sort` order, best-ranked row per title only
+        key = (genre, language, sort)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        rows = self.rows(genre, language)
+        rows = rows[np.argsort(self.ranks[sort][rows], kind="stable")]
+        rows = filter_candidates(rows, self.title_codes, -1)
+
+        with self._lock:
+            self._results[key] = rows
+            while len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return rows
@@ -0,0 +1,138 @@
+import os
+import ast
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# --------------------------------------------------
+# LEAN CATALOG ARTIFACT
+# --------------------------------------------------
+# rebuild_model.py writes model_files/catalog.npz with only the columns the
+# app reads, already decoded:
+#   ids            int64  TMDB id per row (row order == neighbor index rows)
+#   titles         uint8  UTF-8 titles joined by "\n"
+#   genre_mask     uint64 bit i set when the movie has genre_names[i]
+#   genre_names    uint8  UTF-8 genre names joined by "\n"
+#   language_codes int16  index into language_names
+#   language_names uint8  UTF-8 language names joined by "\n"
+#   popularity     float32
+#   vote_average   float32
+#   vote_count     int32
+#   years          int16  release year, 0 when unknown
+# No pickles, so loading is a handful of array reads.
+
+CATALOG_FORMAT_VERSION = 3
+
+# Languages - currently available
+LANGUAGE_NAMES = {
+    "en": "English",
+    "hi": "Hindi",
+    "te": "Telugu",
+    "ta": "Tamil",
+    "ml": "Malayalam",
+    "kn": "Kannada",
+}
+
+
+def extract_genres(genres_str):
+    try:
+        return [g["name"] for g in ast.literal_eval(genres_str)]
+    except:
+        return []
+
+
+def _extract_genres_chunk(values):
+    return [extract_genres(v) for v in values]
+
+
+def parse_genres(genres, workers=1, chunk_size=10_000):
+    # literal_eval is the slow, per-row part of building the catalog;
+    # chunks are parsed in a process pool and reassembled in order
+    values = list(genres)
+    if workers <= 1 or len(values) <= chunk_size:
+        return _extract_genres_chunk(values)
+
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [genres for chunk in pool.map(_extract_genres_chunk, chunks) for genres in chunk]
+
+
+def _encode_strings(values):
+    text = "\n".join(str(v).replace("\n", " ") for v in values)
+    return np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+
+
+def _decode_strings(blob):
+    text = blob.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+
+def build_catalog(df, workers=1):
+    genre_lists = parse_genres(df["genres"], workers)
+    genre_names = sorted({g for genres in genre_lists for g in genres})
+    assert len(genre_names) <= 64, "genre_mask holds at most 64 genres"
+
+    bits = {name: 1 << i for i, name in enumerate(genre_names)}
+    genre_mask = np.array(
+        [sum(bits[g] for g in set(genres)) for genres in genre_lists],
+        dtype=np.uint64
+    )
+
+    language_name = df["original_language"].map(LANGUAGE_NAMES).fillna("Other")
+    language_codes, language_names = pd.factorize(language_name, sort=True)
+
+    def numeric(column, dtype):
+        return pd.to_numeric(df[column], errors="coerce").fillna(0).to_numpy(dtype=dtype)
+
+    return {
+        "format_version": np.array(CATALOG_FORMAT_VERSION),
+        "ids": df["id"].to_numpy(dtype=np.int64),
+        "titles": _encode_strings(df["title"]),
+        "genre_mask": genre_mask,
+        "genre_names": _encode_strings(genre_names),
+        "language_codes": language_codes.astype(np.int16),
+        "language_names": _encode_strings(language_names),
+        "popularity": numeric("popularity", np.float32),
+        "vote_average": numeric("vote_average", np.float32),
+        "vote_count": numeric("vote_count", np.int32),
+        "years": pd.to_datetime(df["release_date"], errors="coerce").dt.year
+                   .fillna(0).to_numpy(dtype=np.int16),
+    }
+
+
+def save_catalog(path, df, workers=1):
+    # written next to the target and renamed, so readers never see half a file
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, **build_catalog(df, workers))
+    os.replace(path + ".tmp", path)
+
+
+def load_catalog(path):
+    # returns (movies DataFrame, genre_names list)
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["format_version"])
+        if version != CATALOG_FORMAT_VERSION:
+            raise ValueError(
+                f"{path} has catalog format {version}, expected "
+                f"{CATALOG_FORMAT_VERSION}; rerun rebuild_model.py"
+            )
+
+        genre_names = _decode_strings(data["genre_names"])
+        movies = pd.DataFrame({
+            "id": data["ids"],
+            "title": _decode_strings(data["titles"]),
+            "genre_mask": data["genre_mask"],
+            "language_name": pd.Categorical.from_codes(
+                data["language_codes"], _decode_strings(data["language_names"])
+            ),
+            "popularity": data["popularity"],
+            "vote_average": data["vote_average"],
+            "vote_count": data["vote_count"],
+            "year": data["years"],
+        })
+
+    return movies, genre_names
+
+
+def genre_bit(genre_names, genre):
+    return np.uint64(1 << genre_names.index(genre))
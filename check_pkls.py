@@ -1,11 +1,16 @@
+import os
 import pickle
 
-movies = pickle.load(open("model_files/movie_list.pkl", "rb"))
-similarity = pickle.load(open("model_files/similarity.pkl", "rb"))
+from neighbors import load_neighbors
+from model_registry import read_manifest, version_dir
+
+model_dir = version_dir("model_files", read_manifest("model_files"))
+movies = pickle.load(open(os.path.join(model_dir, "movie_list.pkl"), "rb"))
+neighbor_indices, neighbor_scores = load_neighbors(model_dir)
 
 print("Movies type:", type(movies))
 print("Movies shape:", movies.shape)
-print("Similarity shape:", similarity.shape)
+print("Neighbor index shape:", neighbor_indices.shape)
 
 print("\nFirst 5 movies:")
 print(movies[["id", "title"]].head())
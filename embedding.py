@@ -0,0 +1,44 @@
+import os
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from neighbors import save_npy, top_k_from_row
+
+# --------------------------------------------------
+# DENSE SVD EMBEDDING
+# --------------------------------------------------
+# Optional rebuild stage: TruncatedSVD projects the 5000-dim sparse TF-IDF
+# rows to a few hundred dense dimensions. Rows are re-normalised, so cosine
+# similarity is still a dot product, and saved as one C-contiguous float32
+# .npy that the app memory-maps. Neighbors of a movie are then a single
+# matrix-vector product over the catalog, with no N x K table to store.
+
+EMBEDDING_FILE = "embeddings.npy"
+DEFAULT_DIMS = 192
+
+
+def build_embedding(vectors, dims=DEFAULT_DIMS, seed=42):
+    # returns (embedding, explained variance ratio)
+    dims = min(dims, vectors.shape[1] - 1)
+    svd = TruncatedSVD(n_components=dims, random_state=seed)
+    embedding = normalize(svd.fit_transform(vectors))
+    return (
+        np.ascontiguousarray(embedding, dtype=np.float32),
+        float(svd.explained_variance_ratio_.sum()),
+    )
+
+
+def save_embedding(model_dir, embedding):
+    save_npy(os.path.join(model_dir, EMBEDDING_FILE), embedding.astype(np.float32, copy=False))
+
+
+def load_embedding(model_dir, mmap=True):
+    return np.load(os.path.join(model_dir, EMBEDDING_FILE), mmap_mode="r" if mmap else None)
+
+
+def embedding_neighbors(embedding, row, k):
+    # best-first (indices, scores) of the k rows closest to `row`
+    scores = embedding @ embedding[row]
+    best = top_k_from_row(scores, k, exclude=row)
+    return best.astype(np.int32), scores[best].astype(np.float32)
@@ -0,0 +1,153 @@
+import os
+import ast
+import json
+import numpy as np
+import scipy.sparse as sp
+
+# --------------------------------------------------
+# OFFLINE GROUND TRUTH FOR EVALUATION
+# --------------------------------------------------
+# Relevance is derived from the dataset itself instead of from the model:
+# two movies are related under a signal when they share
+#   collection  the same TMDB collection (only if the CSV has the column)
+#   director    a director
+#   cast        one of the top TOP_CAST billed actors
+#   keywords    at least MIN_SHARED_KEYWORDS keywords
+# Director and cast never enter the TF-IDF tags, so they are held out from
+# the model; keywords (and genres) do, so that signal is partly circular.
+#
+# Each signal is stored as a sparse rows x groups membership matrix in
+# model_files/ground_truth.npz. A pair of rows is relevant when the dot
+# product of their membership rows reaches the signal's threshold.
+
+GROUND_TRUTH_FILE = "ground_truth.npz"
+
+TOP_CAST = 3
+MIN_SHARED_KEYWORDS = 2
+
+# signal -> minimum number of shared groups
+THRESHOLDS = {
+    "collection": 1,
+    "director": 1,
+    "cast": 1,
+    "keywords": MIN_SHARED_KEYWORDS,
+}
+
+
+def _parse(value):
+    # TMDB CSVs hold JSON lists; Kaggle exports hold Python literals
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None
+
+
+def _names(value, job=None, limit=None):
+    names = [
+        item.get("name")
+        for item in _parse(value) or []
+        if isinstance(item, dict) and (job is None or item.get("job") == job)
+    ]
+    names = [name for name in names if name]
+    return names[:limit] if limit else names
+
+
+def _collection(value):
+    collection = _parse(value)
+    return [collection["id"]] if isinstance(collection, dict) and "id" in collection else []
+
+
+def _membership(groups_per_row):
+    # list of group-name lists -> binary CSR (rows x distinct groups)
+    codes = {}
+    indptr = [0]
+    indices = []
+    for groups in groups_per_row:
+        row = sorted({codes.setdefault(g, len(codes)) for g in groups})
+        indices.extend(row)
+        indptr.append(len(indices))
+
+    return sp.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), indptr),
+        shape=(len(groups_per_row), max(len(codes), 1)),
+    )
+
+
+def build_ground_truth(df):
+    # signal -> membership matrix, row order == catalog rows
+    signals = {
+        "director": _membership([_names(crew, job="Director") for crew in df["crew"]]),
+        "cast": _membership([_names(cast, limit=TOP_CAST) for cast in df["cast"]]),
+        "keywords": _membership([_names(keywords) for keywords in df["keywords"]]),
+    }
+    if "belongs_to_collection" in df.columns:
+        signals["collection"] = _membership([_collection(v) for v in df["belongs_to_collection"]])
+    return signals
+
+
+def save_ground_truth(path, df):
+    arrays = {}
+    for name, members in build_ground_truth(df).items():
+        arrays[f"{name}_indptr"] = members.indptr
+        arrays[f"{name}_indices"] = members.indices
+        arrays[f"{name}_shape"] = np.array(members.shape)
+
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(path + ".tmp", path)
+
+
+def load_ground_truth(path):
+    signals = {}
+    with np.load(path) as data:
+        for name in THRESHOLDS:
+            if f"{name}_indptr" not in data:
+                continue
+            indices = data[f"{name}_indices"]
+            signals[name] = sp.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), indices, data[f"{name}_indptr"]),
+                shape=tuple(data[f"{name}_shape"]),
+            )
+    return signals
+
+
+def relevance(signals, rows, recommended):
+    # signal -> (len(rows), k) bool: is recommended[i, j] related to rows[i]
+    valid = recommended >= 0
+    queries = np.repeat(rows, recommended.shape[1])
+    targets = np.where(valid, recommended, 0).ravel()
+
+    result = {}
+    for name, members in signals.items():
+        shared = np.asarray(members[queries].multiply(members[targets]).sum(axis=1)).ravel()
+        result[name] = (shared >= THRESHOLDS[name]).reshape(recommended.shape) & valid
+    return result
+
+
+def relevant_counts(signals, rows, block_size=256):
+    # signal (and "any") -> number of other catalog rows related to each row
+    n = next(iter(signals.values())).shape[0]
+    counts = {name: np.zeros(len(rows), dtype=np.int64) for name in signals}
+    counts["any"] = np.zeros(len(rows), dtype=np.int64)
+
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        pairs = []
+        for name, members in signals.items():
+            shared = (members[block] @ members.T).tocoo()
+            keep = (shared.data >= THRESHOLDS[name]) & (shared.col != block[shared.row])
+            counts[name][start:start + len(block)] = np.bincount(
+                shared.row[keep], minlength=len(block)
+            )
+            pairs.append(shared.row[keep].astype(np.int64) * n + shared.col[keep])
+
+        # related under any signal: distinct (row, other) pairs
+        related = np.unique(np.concatenate(pairs)) // n
+        counts["any"][start:start + len(block)] = np.bincount(related, minlength=len(block))
+
+    return counts
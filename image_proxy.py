@@ -0,0 +1,229 @@
+import io
+import os
+import re
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import requests
+from PIL import Image
+
+from tmdb_client import BASE_DIR, DAY, REQUEST_TIMEOUT, pooled_session
+
+# --------------------------------------------------
+# RESIZING IMAGE PROXY
+# --------------------------------------------------
+# The app used to hand w500 TMDB URLs to every st.image, so a 70px sidebar
+# thumbnail cost the same download as the details poster. image_url()
+# now asks for the size each slot is drawn at:
+#   sidebar  Recently Viewed thumbnails
+#   cast     cast profile pictures
+#   card     genre, trending and recommendation grids
+#   detail   the poster on a details page
+#
+# With IMAGE_PROXY_URL set, those URLs point at this service instead of
+# TMDB. It fetches each image once, writes every variant to disk as WebP
+# and serves them with a one-year immutable Cache-Control (TMDB image
+# paths change whenever the image does), so browsers and any CDN in front
+# keep them. Without it, the app falls back to TMDB's own sized URLs.
+#
+#   python image_proxy.py --port 8502
+#   IMAGE_PROXY_URL=http://localhost:8502 streamlit run app.py
+
+TMDB_IMAGE_URL = os.environ.get("TMDB_IMAGE_URL", "https://image.tmdb.org/t/p")
+IMAGE_PROXY_URL = os.environ.get("IMAGE_PROXY_URL")
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(BASE_DIR, "cache", "images"))
+
+# variant -> width in px; the same widths TMDB serves, for the fallback
+IMAGE_VARIANTS = {"sidebar": 154, "cast": 185, "card": 342, "detail": 500}
+SOURCE_SIZE = "w500"  # fetched once per image, the largest variant
+
+WEBP_QUALITY = 80
+MAX_IMAGE_CACHE_BYTES = 1024 * 1024 * 1024
+EVICT_EVERY = 200  # images fetched between eviction passes
+TOUCH_AFTER = DAY  # coarse LRU: a hit refreshes mtime at most once a day
+CACHE_CONTROL = f"public, max-age={365 * DAY}, immutable"
+
+# /<variant>/<TMDB file name>, e.g. /card/kqjL17yufvn9OVLyXYpvtyrFfak.jpg
+PROXY_PATH = re.compile(r"/(%s)/([\w-]+)\.(jpg|jpeg|png)" % "|".join(IMAGE_VARIANTS))
+
+
+def image_url(path, variant):
+    # browser URL of a TMDB image path ("/abc.jpg") drawn as `variant`
+    if not path:
+        return None
+    path = "/" + path.lstrip("/")
+    if IMAGE_PROXY_URL:
+        return f"{IMAGE_PROXY_URL.rstrip('/')}/{variant}{path}"
+    return f"{TMDB_IMAGE_URL}/w{IMAGE_VARIANTS[variant]}{path}"
+
+
+# --------------------------------------------------
+# DISK CACHE
+# --------------------------------------------------
+
+class ImageCache:
+    def __init__(self, root=IMAGE_CACHE_DIR, source_url=TMDB_IMAGE_URL, max_bytes=MAX_IMAGE_CACHE_BYTES):
+        self.root = root
+        self.source_url = source_url.rstrip("/")
+        self.max_bytes = max_bytes
+        self.session = pooled_session()
+        self._fills = 0
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+        for variant in IMAGE_VARIANTS:
+            os.makedirs(os.path.join(root, variant), exist_ok=True)
+        self.evict()
+
+    def _path(self, variant, name):
+        return os.path.join(self.root, variant, name + ".webp")
+
+    def get(self, variant, name, ext):
+        # WebP bytes of one variant, or None when the source is unavailable
+        path = self._path(variant, name)
+        body = self._read(path)
+        if body is not None:
+            return body
+
+        # one fetch per image, however many requests are waiting for it
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            body = self._read(path)
+            if body is None and self._fill(name, ext):
+                body = self._read(path)
+        with self._locks_guard:
+            self._locks.pop(name, None)
+        return body
+
+    def _read(self, path):
+        # evict() on another thread may delete the file at any point here
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            if os.path.getmtime(path) < time.time() - TOUCH_AFTER:
+                os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted after the read; the bytes are still good
+        return body
+
+    def _fill(self, name, ext):
+        url = f"{self.source_url}/{SOURCE_SIZE}/{name}.{ext}"
+        try:
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            source = Image.open(io.BytesIO(response.content))
+            source = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+        except (requests.RequestException, OSError) as e:
+            print("IMAGE FETCH ERROR:", url, e)
+            return False
+
+        for variant, width in IMAGE_VARIANTS.items():
+            image = source
+            if image.width > width:
+                image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+            out = io.BytesIO()
+            image.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+            path = self._path(variant, name)
+            with open(path + ".tmp", "wb") as f:
+                f.write(out.getvalue())
+            os.replace(path + ".tmp", path)
+
+        self._fills += 1
+        if self._fills % EVICT_EVERY == 0:
+            self.evict()
+        return True
+
+    def evict(self):
+        # least recently served images first, until under max_bytes
+        files = []
+        for variant in IMAGE_VARIANTS:
+            with os.scandir(os.path.join(self.root, variant)) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".webp"):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# --------------------------------------------------
+# HTTP SERVICE
+# --------------------------------------------------
+
+class ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = PROXY_PATH.fullmatch(urlparse(self.path).path)
+        if not match:
+            self.send_error(404)
+            return
+        variant, name, ext = match.groups()
+
+        # the URL never changes meaning, so its name is a valid ETag
+        etag = f'"{variant}-{name}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", CACHE_CONTROL)
+            self.end_headers()
+            return
+
+        body = self.server.cache.get(variant, name, ext)
+        if body is None:
+            self.send_response(502)
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/webp")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", CACHE_CONTROL)
+        self.send_header("ETag", etag)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_proxy(port=0, host="127.0.0.1", cache=None):
+    # starts the proxy in a daemon thread; port 0 picks a free port
+    server = ThreadingHTTPServer((host, port), ImageHandler)
+    server.daemon_threads = True
+    server.cache = cache or ImageCache()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resizing TMDB image proxy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--cache-dir", default=IMAGE_CACHE_DIR)
+    parser.add_argument("--max-mb", type=int, default=MAX_IMAGE_CACHE_BYTES // (1024 * 1024))
+    args = parser.parse_args()
+
+    cache = ImageCache(args.cache_dir, max_bytes=args.max_mb * 1024 * 1024)
+    server, url = start_proxy(args.port, args.host, cache)
+    print("Image proxy listening on", url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,72 +1,178 @@
+import os
+import json
+import time
+import argparse
 import numpy as np
 
-
-# hit rate: “Does the recommended list contain a relevant movie?”
-def evaluate_hit_rate_at_k(similarity, k=5, sample_size=200):
-    hits = 0
-    total = 0
-
-    n = min(sample_size, similarity.shape[0])
-
-    for i in range(n):
-        scores = list(enumerate(similarity[i]))
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-
-        # ignore self (index 0)
-        recommended = [idx for idx, _ in scores[1:k+1]]
-
-        # assume top-1 similar movie is relevant
-        relevant = scores[1][0]
-
-        if relevant in recommended:
-            hits += 1
-        total += 1
-
-    return hits / total
-
-
-#precision: “Out of the recommended movies, how many are actually relevant?”
-def evaluate_precision_at_k(similarity, k=5, sample_size=200):
-    precision_sum = 0
-    n = min(sample_size, similarity.shape[0])
-
-    for i in range(n):
-        scores = list(enumerate(similarity[i]))
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-
-        recommended = [idx for idx, _ in scores[1:k+1]]
-        relevant = scores[1][0]
-
-        if relevant in recommended:
-            precision_sum += 1 / k
-
-    return precision_sum / n
-
-
-#Mean Reciprocal Rank (MRR): “How early does the relevant movie appear in recommendations?”
-def evaluate_mrr(similarity, sample_size=200):
-    rr_sum = 0
-    n = min(sample_size, similarity.shape[0])
-
-    for i in range(n):
-        scores = list(enumerate(similarity[i]))
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-
-        relevant = scores[1][0]
-
-        for rank, (idx, _) in enumerate(scores[1:], start=1):
-            if idx == relevant:
-                rr_sum += 1 / rank
-                break
-
-    return rr_sum / n
-
-print("Evaluating recommendation model...\n")
-
-hit_rate = evaluate_hit_rate_at_k(similarity, k=5, sample_size=200)
-precision = evaluate_precision_at_k(similarity, k=5, sample_size=200)
-mrr = evaluate_mrr(similarity, sample_size=200)
-
-print(f"Hit Rate@5      : {hit_rate:.4f}")
-print(f"Precision@5     : {precision:.4f}")
-print(f"MRR             : {mrr:.4f}")
+from ann import DEFAULT_TABLES, DEFAULT_PROBES, DEFAULT_MAX_CANDIDATES
+from neighbors import DEFAULT_BLOCK_SIZE, load_vectors, neighbors_for_rows
+from ground_truth import GROUND_TRUTH_FILE, load_ground_truth, relevance, relevant_counts
+from model_registry import load_artifacts, read_manifest, version_dir
+
+# --------------------------------------------------
+# BATCHED MODEL EVALUATION
+# --------------------------------------------------
+# Loads the artifacts in model_files itself and scores the served backend
+# over the whole catalog (or a sample):
+#   ground truth    recall@k, ndcg@k and hit_rate@k against the dataset's
+#                   own relations (ground_truth.py), per signal and "any"
+#   coverage        share of the catalog that is ever recommended
+#   recall@k_vs_exact  overlap with exact TF-IDF search, i.e. what an
+#                   approximate or compressed backend loses
+# The exact baseline is one blocked sparse product + argpartition per block
+# of rows; the metrics are array comparisons, no per-row sorting.
+# The report is printed as JSON and can be appended to a JSON-lines file to
+# track build quality and speed over time.
+#
+#   python metric_scores.py --output eval_history.jsonl
+
+EVAL_K = 5
+
+
+def recommended_rows(artifacts, rows, k, block_size=DEFAULT_BLOCK_SIZE, **search):
+    # (len(rows), k) best-first rows the app would serve; -1 pads short ANN lists
+    if artifacts.neighbor_indices is not None:
+        return np.asarray(artifacts.neighbor_indices[rows, :k])
+
+    if artifacts.ann is None:
+        # embedding backend: the per-query matrix-vector product, batched
+        return neighbors_for_rows(artifacts.vectors, rows, k, block_size)[0]
+
+    result = np.full((len(rows), k), -1, dtype=np.int32)
+    for i, row in enumerate(rows):
+        found = artifacts.similar_rows(row, k, **search)
+        result[i, :len(found)] = found
+    return result
+
+
+def recall_vs_exact(recommended, exact):
+    # recommended, exact: (rows, k) best-first row indices
+    overlap = (recommended[:, :, None] == exact[:, None, :]).any(axis=2).sum(axis=1)
+    return float(overlap.mean() / exact.shape[1])
+
+
+def ground_truth_metrics(related, counts):
+    # related: (rows, k) bool per recommendation; counts: relevant movies per
+    # row in the whole catalog. Recall is capped at k (hits / min(k, |R|)),
+    # rows without any relevant movie are left out.
+    k = related.shape[1]
+    has = counts > 0
+    if not has.any():
+        return {"queries": 0}
+
+    related, counts = related[has], np.minimum(counts[has], k)
+    discounts = 1 / np.log2(np.arange(2, k + 2))
+    dcg = (related * discounts).sum(axis=1)
+    ideal = np.cumsum(discounts)[counts - 1]
+
+    return {
+        "queries": int(has.sum()),
+        f"recall@{k}": float((related.sum(axis=1) / counts).mean()),
+        f"ndcg@{k}": float((dcg / ideal).mean()),
+        f"hit_rate@{k}": float(related.any(axis=1).mean()),
+    }
+
+
+def evaluate(
+    model_dir="model_files",
+    k=EVAL_K,
+    sample_size=None,
+    block_size=DEFAULT_BLOCK_SIZE,
+    seed=0,
+    **search,
+):
+    manifest = read_manifest(model_dir)
+    artifacts = load_artifacts(model_dir, manifest)
+    build_dir = version_dir(model_dir, manifest)
+    n = len(artifacts.movies)
+
+    rows = np.arange(n)
+    if sample_size and sample_size < n:
+        rows = np.sort(np.random.default_rng(seed).choice(n, sample_size, replace=False))
+
+    start = time.perf_counter()
+    recommended = recommended_rows(artifacts, rows, k, block_size, **search)
+    recommend_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if manifest.get("backend", "exact") == "exact" and manifest.get("space", "tfidf") == "tfidf":
+        # the served table already is the exact baseline
+        exact = recommended
+    else:
+        tfidf_vectors = load_vectors(build_dir)
+        exact = neighbors_for_rows(tfidf_vectors, rows, k, block_size)[0]
+    baseline_seconds = time.perf_counter() - start
+
+    metrics = {
+        f"recall@{k}_vs_exact": recall_vs_exact(recommended, exact),
+        "catalog_coverage": float(len(np.unique(recommended[recommended >= 0])) / n),
+    }
+
+    start = time.perf_counter()
+    ground_truth_path = os.path.join(build_dir, GROUND_TRUTH_FILE)
+    if os.path.exists(ground_truth_path):
+        signals = load_ground_truth(ground_truth_path)
+        counts = relevant_counts(signals, rows)
+
+        related = {name: np.zeros(recommended.shape, dtype=bool) for name in signals}
+        for begin in range(0, len(rows), block_size):
+            end = begin + block_size
+            for name, block in relevance(signals, rows[begin:end], recommended[begin:end]).items():
+                related[name][begin:end] = block
+        related["any"] = np.logical_or.reduce(list(related.values()))
+
+        metrics["ground_truth"] = {
+            name: ground_truth_metrics(related[name], counts[name]) for name in related
+        }
+    ground_truth_seconds = time.perf_counter() - start
+
+    return {
+        "model_version": artifacts.version,
+        "backend": manifest.get("backend", "exact"),
+        "space": manifest.get("space", "tfidf"),
+        "built_at": manifest.get("built_at"),
+        "evaluated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rows": int(len(rows)),
+        "k": k,
+        "search": search if artifacts.ann is not None else {},
+        "metrics": metrics,
+        "timings": {
+            "recommend_seconds": round(recommend_seconds, 3),
+            "recommend_ms_per_query": round(recommend_seconds / len(rows) * 1000, 4),
+            "baseline_seconds": round(baseline_seconds, 3),
+            "ground_truth_seconds": round(ground_truth_seconds, 3),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate MoviMate model artifacts")
+    parser.add_argument("model_dir", nargs="?", default="model_files")
+    parser.add_argument("--k", type=int, default=EVAL_K)
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=None,
+        help="evaluate a random sample of rows instead of the full catalog"
+    )
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--n-tables", type=int, default=DEFAULT_TABLES)
+    parser.add_argument("--n-probes", type=int, default=DEFAULT_PROBES)
+    parser.add_argument("--max-candidates", type=int, default=DEFAULT_MAX_CANDIDATES)
+    parser.add_argument("--output", help="append the report to this JSON-lines file")
+    args = parser.parse_args()
+
+    report = evaluate(
+        args.model_dir,
+        k=args.k,
+        sample_size=args.sample_size,
+        block_size=args.block_size,
+        n_tables=args.n_tables,
+        n_probes=args.n_probes,
+        max_candidates=args.max_candidates,
+    )
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(report) + "\n")
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import pandas as pd
+
+from catalog import load_catalog
+from browse_index import BrowseIndex
+from title_index import TitleIndex
+from neighbors import DEFAULT_TOP_K, load_neighbors, load_vectors, INDICES_FILE, SCORES_FILE, VECTORS_FILES
+from ann import LSH_FILES, LSHIndex
+from embedding import EMBEDDING_FILE, load_embedding, embedding_neighbors
+
+# --------------------------------------------------
+# MODEL REGISTRY
+# --------------------------------------------------
+# rebuild_model.py writes each build into a new directory under
+# model_files/versions/ and then replaces model_files/manifest.json, which
+# names that directory. Files are never rewritten in place, so a worker
+# (re)loading at any moment reads one complete build, and processes that
+# still memory-map an older build keep valid files. The manifest's
+# "version" is a content hash of the artifacts. The registry
+# serves one immutable ModelArtifacts snapshot per version: when the
+# manifest changes, the new version is loaded on a background thread and
+# swapped in with a single reference assignment, so renders already in
+# flight keep using the snapshot they started with.
+
+MANIFEST_FILE = "manifest.json"
+CATALOG_FILE = "catalog.npz"
+
+# similarity backend chosen at build time -> the files it serves from.
+# Backends that score at query time also need the vectors of their space.
+BACKEND_FILES = {
+    "exact": [INDICES_FILE, SCORES_FILE],
+    "lsh": list(LSH_FILES.values()),
+    "embedding": [],
+}
+SPACE_FILES = {
+    "tfidf": list(VECTORS_FILES.values()),
+    "svd": [EMBEDDING_FILE],
+}
+
+VERSIONS_DIR = "versions"
+KEEP_VERSIONS = 3  # builds kept on disk, the current one included
+
+CHECK_INTERVAL = 10  # seconds between manifest checks
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def new_build_dir(model_dir):
+    # empty directory for one build; names sort by start time
+    path = os.path.join(model_dir, VERSIONS_DIR, time.strftime("%Y%m%d-%H%M%S-") + str(os.getpid()))
+    os.makedirs(path)
+    return path
+
+
+def version_dir(model_dir, manifest):
+    # where the artifacts of `manifest` live; manifests from before
+    # versioned builds describe files in model_dir itself
+    if "dir" not in manifest:
+        return model_dir
+    return os.path.join(model_dir, manifest["dir"])
+
+
+def write_manifest(model_dir, build_dir, backend="exact", space="tfidf", extra=None):
+    # publishes the finished build in build_dir as the current version
+    names = [CATALOG_FILE] + BACKEND_FILES[backend]
+    if backend != "exact":
+        names += SPACE_FILES[space]
+    files = {
+        name: {
+            "sha256": _sha256(os.path.join(build_dir, name)),
+            "size": os.path.getsize(os.path.join(build_dir, name)),
+        }
+        for name in names
+    }
+    version = hashlib.sha256(
+        "".join(files[name]["sha256"] for name in names).encode()
+    ).hexdigest()[:16]
+
+    manifest = {
+        "version": version,
+        "dir": os.path.relpath(build_dir, model_dir),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": backend,
+        "space": space,
+        "files": files,
+        **(extra or {}),
+    }
+
+    path = os.path.join(model_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+    _prune_versions(model_dir, os.path.basename(build_dir))
+    return manifest
+
+
+def _prune_versions(model_dir, current):
+    # Older builds beyond KEEP_VERSIONS go; a worker that has one mapped
+    # keeps its open files until it reloads. Directories newer than
+    # `current` belong to builds still running and are left alone.
+    versions = os.path.join(model_dir, VERSIONS_DIR)
+    names = sorted(os.listdir(versions))
+    older = names[:names.index(current)]
+    for name in older[:max(len(older) - (KEEP_VERSIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+
+
+def read_manifest(model_dir):
+    try:
+        with open(os.path.join(model_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # artifacts from a rebuild that predates manifests
+        return {"version": "unversioned", "files": {}}
+
+
+class ModelArtifacts:
+    # One loaded model version plus the lookups derived from it. Never
+    # mutated after construction, so it is safe to share across sessions.
+
+    def __init__(
+        self,
+        version,
+        movies,
+        genre_names,
+        neighbor_indices=None,
+        neighbor_scores=None,
+        vectors=None,
+        ann=None,
+    ):
+        self.version = version
+        self.movies = movies
+        self.genre_names = genre_names
+        self.neighbor_indices = neighbor_indices
+        self.neighbor_scores = neighbor_scores
+        self.vectors = vectors
+        self.ann = ann
+
+        # integer code per title, so duplicate / self filtering runs on arrays
+        self.title_codes, _ = pd.factorize(movies["title"])
+
+        # Offline id lookups: title -> TMDB id (first row wins, like the
+        # details view) and TMDB id -> row position
+        self.movie_ids = movies["id"].astype(int).to_numpy()
+        self.title_to_id = {}
+        for title, movie_id in zip(movies["title"], self.movie_ids):
+            self.title_to_id.setdefault(title, int(movie_id))
+        self.id_to_row = {int(movie_id): row for row, movie_id in enumerate(self.movie_ids)}
+
+        # genre x language posting lists for the browse section
+        self.browse = BrowseIndex.from_movies(movies, genre_names, self.title_codes)
+
+        # typo-tolerant search box
+        self.search = TitleIndex.from_movies(movies)
+
+    def similar_rows(self, row, k=DEFAULT_TOP_K, **search):
+        # best-first neighbor rows: precomputed for the exact backend,
+        # queried from the LSH index with the given recall/latency knobs,
+        # or one matrix-vector product over the SVD embedding
+        if self.neighbor_indices is not None:
+            return self.neighbor_indices[row][:k]
+        if self.ann is not None:
+            return self.ann.query(self.vectors, row, k, **search)[0]
+        return embedding_neighbors(self.vectors, row, k)[0]
+
+
+def load_artifacts(model_dir, manifest=None):
+    manifest = manifest or read_manifest(model_dir)
+    model_dir = version_dir(model_dir, manifest)
+
+    # catches files truncated or replaced after the build
+    for name, info in manifest["files"].items():
+        size = os.path.getsize(os.path.join(model_dir, name))
+        if size != info["size"]:
+            raise ValueError(f"{name} does not match manifest {manifest['version']}")
+
+    movies, genre_names = load_catalog(os.path.join(model_dir, CATALOG_FILE))
+
+    backend = manifest.get("backend", "exact")
+    if backend == "exact":
+        neighbor_indices, neighbor_scores = load_neighbors(model_dir)
+        rows = neighbor_indices.shape[0]
+        artifacts = {"neighbor_indices": neighbor_indices, "neighbor_scores": neighbor_scores}
+    else:
+        if manifest.get("space", "tfidf") == "svd":
+            vectors = load_embedding(model_dir)
+        else:
+            vectors = load_vectors(model_dir)
+        rows = vectors.shape[0]
+        artifacts = {"vectors": vectors}
+        if backend == "lsh":
+            artifacts["ann"] = LSHIndex.load(model_dir)
+
+    if rows != len(movies):
+        raise ValueError(f"similarity index has {rows} rows, catalog has {len(movies)}")
+
+    return ModelArtifacts(manifest["version"], movies, genre_names, **artifacts)
+
+
+class ModelRegistry:
+    def __init__(self, model_dir, check_interval=CHECK_INTERVAL):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._current = load_artifacts(model_dir)
+        self._next_check = time.monotonic() + check_interval
+        self._lock = threading.Lock()
+        self._loading = False
+
+    def current(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self._maybe_reload()
+        return self._current
+
+    def _maybe_reload(self):
+        try:
+            version = read_manifest(self.model_dir)["version"]
+        except (OSError, ValueError) as e:
+            print("MODEL MANIFEST ERROR:", e)
+            return
+
+        with self._lock:
+            if version == self._current.version or self._loading:
+                return
+            self._loading = True
+
+        threading.Thread(target=self._reload, daemon=True).start()
+
+    def _reload(self):
+        try:
+            artifacts = load_artifacts(self.model_dir)
+            self._current = artifacts
+            print("MODEL RELOADED:", artifacts.version)
+        except Exception as e:
+            # keep serving the previous version; retried on the next check
+            print("MODEL RELOAD ERROR:", e)
+        finally:
+            with self._lock:
+                self._loading = False
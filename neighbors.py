@@ -0,0 +1,308 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+
+# --------------------------------------------------
+# TOP-K NEIGHBOR INDEX
+# --------------------------------------------------
+# Instead of the full N x N similarity matrix we keep, for every movie,
+# only its K most similar movies: an (N, K) int32 array of row indices and
+# an (N, K) float32 array of cosine scores, both sorted best-first.
+# Memory grows linearly with the catalog instead of quadratically.
+#
+# Both arrays are stored as raw .npy files and opened with mmap_mode="r",
+# so every Streamlit worker on a host shares the same page-cache pages and
+# "loading" is just mapping the files.
+
+DEFAULT_TOP_K = 50
+DEFAULT_BLOCK_SIZE = 512  # rows of the similarity matrix held in memory at once
+
+INDICES_FILE = "neighbor_indices.npy"
+SCORES_FILE = "neighbor_scores.npy"
+
+# The TF-IDF rows are kept the same way, as the three CSR arrays plus the
+# shape, so query-time backends map them instead of loading a private copy.
+VECTORS_FILES = {
+    "data": "tfidf_data.npy",
+    "indices": "tfidf_indices.npy",
+    "indptr": "tfidf_indptr.npy",
+    "shape": "tfidf_shape.npy",
+}
+
+
+def _best_k(scores, k, keys=None):
+    # column positions of the k best scores per row, best-first. Equal
+    # scores go to the lower key (default: the column), so a rebuild of the
+    # same data always yields the same lists.
+    if keys is None:
+        keys = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    part = np.argpartition(scores, -k, axis=1)[:, -k:]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+
+    # argpartition keeps an arbitrary subset of the columns tied at the
+    # k-th score; those (rare) rows get a full sort
+    cutoff = part_scores.min(axis=1, keepdims=True)
+    for row in np.flatnonzero((scores >= cutoff).sum(axis=1) > k):
+        part[row] = np.lexsort((keys[row], -scores[row]))[:k]
+        part_scores[row] = scores[row, part[row]]
+
+    order = np.lexsort((np.take_along_axis(keys, part, axis=1), -part_scores), axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def top_k_rows(block, k=DEFAULT_TOP_K, row_offset=0, self_cols=None, copy=True):
+    # block: dense (rows, N) similarity scores for movies
+    # row_offset .. row_offset + rows (or for the rows listed in self_cols).
+    # The movie itself is never a neighbor. copy=False lets a scratch
+    # float32 block be overwritten instead of duplicated.
+    block = np.array(block, dtype=np.float32, copy=copy or None)
+    n_rows, n_cols = block.shape
+    k = min(k, n_cols - 1)
+
+    rows = np.arange(n_rows)
+    if self_cols is None:
+        self_cols = rows + row_offset
+    block[rows, self_cols] = -np.inf
+
+    indices, scores = _best_k(block, k)
+    return indices.astype(np.int32), scores.astype(np.float32)
+
+
+def merge_top_k(indices, scores, k):
+    # keep the k best (index, score) candidates of every row; ties go to
+    # the lower index, as in a full build
+    best, best_scores = _best_k(scores, k, keys=indices)
+    return (
+        np.take_along_axis(indices, best, axis=1).astype(np.int32),
+        best_scores.astype(np.float32),
+    )
+
+
+def neighbors_for_rows(vectors, rows, k=DEFAULT_TOP_K, block_size=DEFAULT_BLOCK_SIZE):
+    # Exact top-k for `rows` against every row of `vectors`, one block of
+    # rows at a time. TF-IDF rows are L2-normalised, so cosine similarity
+    # is a plain dot product.
+    rows = np.asarray(rows, dtype=np.int64)
+    k = min(k, vectors.shape[0] - 1)
+    indices = np.empty((len(rows), k), dtype=np.int32)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        sims = vectors[block_rows] @ vectors.T
+        if sp.issparse(sims):
+            sims = sims.toarray()
+        end = start + len(block_rows)
+        indices[start:end], scores[start:end] = top_k_rows(
+            sims, k, self_cols=block_rows, copy=False
+        )
+
+    return indices, scores
+
+
+# state of a build_neighbors_to_disk worker process
+_worker = {}
+
+
+def _init_block_worker(vectors, paths, k):
+    _worker["vectors"] = vectors
+    _worker["outputs"] = [np.load(path, mmap_mode="r+") for path in paths]
+    _worker["k"] = k
+
+
+def _write_block(vectors, outputs, k, start, stop):
+    rows = np.arange(start, stop)
+    indices, scores = neighbors_for_rows(vectors, rows, k, block_size=len(rows))
+    outputs[0][start:stop] = indices
+    outputs[1][start:stop] = scores
+
+
+def _run_block(bounds):
+    _write_block(_worker["vectors"], _worker["outputs"], _worker["k"], *bounds)
+    for output in _worker["outputs"]:
+        output.flush()
+    return bounds
+
+
+def build_neighbors_to_disk(
+    model_dir, vectors, k=DEFAULT_TOP_K, block_size=DEFAULT_BLOCK_SIZE, workers=1
+):
+    # Blocked full build: each block of rows is scored against the whole
+    # catalog, reduced to its top-k and written straight into memory-mapped
+    # .npy files. Peak memory is about block_size * N * 12 bytes (per
+    # worker) instead of the N * N * 8 of a dense similarity matrix.
+    #
+    # With workers > 1 the blocks are spread over a process pool. Every
+    # worker writes its own disjoint rows into the shared files, and a
+    # block's result depends only on its rows, so the output is identical
+    # for any number of workers.
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    if sp.issparse(vectors):
+        vectors = sp.csr_matrix(vectors, dtype=np.float32)
+    else:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    targets = {
+        INDICES_FILE: np.int32,
+        SCORES_FILE: np.float32,
+    }
+    paths = [os.path.join(model_dir, name + ".tmp") for name in targets]
+    for path, dtype in zip(paths, targets.values()):
+        np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(n, k)).flush()
+
+    blocks = [(start, min(n, start + block_size)) for start in range(0, n, block_size)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_block_worker,
+            initargs=(vectors, paths, k),
+        ) as pool:
+            for _ in pool.map(_run_block, blocks):
+                pass
+    else:
+        outputs = [np.load(path, mmap_mode="r+") for path in paths]
+        for start, stop in blocks:
+            _write_block(vectors, outputs, k, start, stop)
+        for output in outputs:
+            output.flush()
+        del outputs
+
+    for name in targets:
+        path = os.path.join(model_dir, name)
+        os.replace(path + ".tmp", path)
+
+    return n, k
+
+
+def update_neighbors(vectors, old_indices, old_scores, old_to_new, dirty_rows, k=DEFAULT_TOP_K):
+    # Incrementally refresh a neighbor index after some movies were added,
+    # changed or removed.
+    #   vectors     new (N, D) L2-normalised rows
+    #   old_to_new  new row of every old row, -1 if the movie was removed
+    #   dirty_rows  new rows that are new or whose vector changed
+    # Clean rows whose old list is still fully valid only need their old
+    # list merged with scores against the dirty rows. Dirty rows and rows
+    # that lost a neighbor are recomputed exactly against the whole catalog.
+    # Returns (indices, scores, recomputed_rows).
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    dirty_rows = np.asarray(dirty_rows, dtype=np.int64)
+
+    dirty = np.zeros(n, dtype=bool)
+    dirty[dirty_rows] = True
+
+    new_to_old = np.full(n, -1, dtype=np.int64)
+    kept = np.flatnonzero(old_to_new >= 0)
+    new_to_old[old_to_new[kept]] = kept
+
+    clean_rows = np.flatnonzero(~dirty)
+    old_rows = new_to_old[clean_rows]
+
+    cand_idx = old_to_new[old_indices[old_rows]]
+    cand_scores = np.array(old_scores[old_rows], dtype=np.float32)
+    stale = (cand_idx < 0) | dirty[np.maximum(cand_idx, 0)]
+
+    lost = stale.any(axis=1)
+    if old_indices.shape[1] < k:
+        lost[:] = True
+
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+
+    patch = clean_rows[~lost]
+    if len(patch):
+        cand_idx, cand_scores = cand_idx[~lost], cand_scores[~lost]
+        if len(dirty_rows):
+            sims = vectors[patch] @ vectors[dirty_rows].T
+            if sp.issparse(sims):
+                sims = sims.toarray()
+            cand_idx = np.hstack([cand_idx, np.broadcast_to(dirty_rows, sims.shape)])
+            cand_scores = np.hstack([cand_scores, sims.astype(np.float32)])
+            indices[patch], scores[patch] = merge_top_k(cand_idx, cand_scores, k)
+        else:
+            # nothing changed: the old lists are already best-first
+            indices[patch], scores[patch] = cand_idx[:, :k], cand_scores[:, :k]
+
+    recompute = np.sort(np.concatenate([dirty_rows, clean_rows[lost]]))
+    if len(recompute):
+        indices[recompute], scores[recompute] = neighbors_for_rows(vectors, recompute, k)
+
+    return indices, scores, recompute
+
+
+def save_npy(path, array):
+    # write next to the target and rename, so readers never map a partial file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+
+def save_neighbors(model_dir, indices, scores):
+    save_npy(os.path.join(model_dir, INDICES_FILE), indices.astype(np.int32))
+    save_npy(os.path.join(model_dir, SCORES_FILE), scores.astype(np.float32))
+
+
+def load_neighbors(model_dir, mmap=True):
+    mode = "r" if mmap else None
+    indices = np.load(os.path.join(model_dir, INDICES_FILE), mmap_mode=mode)
+    scores = np.load(os.path.join(model_dir, SCORES_FILE), mmap_mode=mode)
+    return indices, scores
+
+
+def save_vectors(model_dir, vectors):
+    vectors = sp.csr_matrix(vectors, dtype=np.float32)
+    # canonical order up front: a read-only mapped matrix cannot sort later
+    vectors.sort_indices()
+    arrays = {
+        "data": vectors.data,
+        "indices": vectors.indices,
+        "indptr": vectors.indptr,
+        "shape": np.array(vectors.shape, dtype=np.int64),
+    }
+    for part, name in VECTORS_FILES.items():
+        save_npy(os.path.join(model_dir, name), arrays[part])
+
+
+def load_vectors(model_dir, mmap=True):
+    mode = "r" if mmap else None
+    arrays = {
+        part: np.load(os.path.join(model_dir, name), mmap_mode=mode)
+        for part, name in VECTORS_FILES.items()
+    }
+    return sp.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=tuple(int(n) for n in arrays["shape"]),
+        copy=False,
+    )
+
+
+def top_k_from_row(scores, k, exclude=None):
+    # best-first indices of the k highest scores in a single 1-D row,
+    # O(N) argpartition + O(k log k) sort instead of sorting the whole row
+    scores = np.asarray(scores, dtype=np.float32)
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+
+    k = min(k, scores.shape[0])
+    part = np.argpartition(scores, -k)[-k:]
+    part = part[np.lexsort((part, -scores[part]))]
+
+    return part[np.isfinite(scores[part])]
+
+
+def filter_candidates(candidates, title_codes, exclude_code):
+    # drop the selected movie's own title and keep only the first (best)
+    # candidate for every title, preserving the ranking order
+    candidates = np.asarray(candidates)
+    codes = title_codes[candidates]
+
+    keep = codes != exclude_code
+    candidates, codes = candidates[keep], codes[keep]
+
+    _, first = np.unique(codes, return_index=True)
+    return candidates[np.sort(first)]
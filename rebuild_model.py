@@ -1,216 +1,429 @@
 import os
+import json
+import argparse
+import numpy as np
 import pandas as pd
 import pickle
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
-# --------------------------------------------------
-# 0. PATH SETUP (SINGLE SOURCE OF TRUTH)
-# --------------------------------------------------
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-DATASET_DIR = os.path.join(BASE_DIR, "Dataset")
-MODEL_DIR = os.path.join(BASE_DIR, "model_files")
-
-os.makedirs(MODEL_DIR, exist_ok=True)
-
-MOVIES_CSV = os.path.join(DATASET_DIR, "tmdb_5000_movies.csv")
-CREDITS_CSV = os.path.join(DATASET_DIR, "tmdb_5000_credits.csv")
-
-MOVIE_PKL = os.path.join(MODEL_DIR, "movie_list.pkl")
-SIM_PKL = os.path.join(MODEL_DIR, "similarity.pkl")
-
-print("REBUILD CWD:", os.getcwd())
-print("USING MOVIES CSV:", MOVIES_CSV)
-print("USING CREDITS CSV:", CREDITS_CSV)
-
-# --------------------------------------------------
-# 1. LOAD DATASETS
-# --------------------------------------------------
-
-movies = pd.read_csv(MOVIES_CSV, encoding="latin1", low_memory=False)
-credits = pd.read_csv(CREDITS_CSV, encoding="latin1", low_memory=False)
-
-print("CSV FILES LOADED SUCCESSFULLY")
-print("Total movies in CSV:", movies.shape[0])
-print("Last 10 movies in CSV:")
-print(movies[["id", "title"]].tail(10))
-
-# --------------------------------------------------
-# 2. NORMALIZE ID COLUMNS
-# --------------------------------------------------
-
-movies["id"] = pd.to_numeric(movies["id"], errors="coerce")
-credits["movie_id"] = pd.to_numeric(credits["movie_id"], errors="coerce")
-
-movies = movies.dropna(subset=["id"])
-credits = credits.dropna(subset=["movie_id"])
-
-movies["id"] = movies["id"].astype(int)
-credits["movie_id"] = credits["movie_id"].astype(int)
-
-# --------------------------------------------------
-# 3. DEDUPLICATION (SAFE, AFTER ID REPAIR)
-# --------------------------------------------------
-
-movies = movies.drop_duplicates(subset="id", keep="last")
-credits = credits.drop_duplicates(subset="movie_id", keep="last")
-
-print("After ID cleanup:")
-print("Movies:", movies.shape[0])
-print("Credits:", credits.shape[0])
-
-# --------------------------------------------------
-# 4. MERGE (LEFT JOIN — THIS IS THE FIX)
-# --------------------------------------------------
-
-df = movies.merge(
-    credits,
-    left_on="id",
-    right_on="movie_id",
-    how="left"
-)
-
-# fill missing credits safely
-df["cast"] = df["cast"].fillna("[]")
-df["crew"] = df["crew"].fillna("[]")
-
-print("DATASETS MERGED SUCCESSFULLY")
-print("Movies after merge:", df.shape[0])
-
-# --------------------------------------------------
-# 5. SELECT & RENAME COLUMNS
-# --------------------------------------------------
-
-df = df[
-    ["id", "title_x", "overview", "genres", "keywords", "cast", "crew", "original_language"]
-]
-
-df.rename(columns={"title_x": "title"}, inplace=True)
-
-# --------------------------------------------------
-# 6. FINAL CLEANUP
-# --------------------------------------------------
-
-df.fillna("", inplace=True)
-df.drop_duplicates(subset="id", inplace=True)
-
-# --------------------------------------------------
-# 7. CREATE TAGS
-# --------------------------------------------------
-
-df["tags"] = (
-    df["overview"].astype(str) + " " +
-    df["genres"].astype(str) + " " +
-    df["keywords"].astype(str)
+from neighbors import (
+    DEFAULT_TOP_K, DEFAULT_BLOCK_SIZE, VECTORS_FILES, top_k_rows, save_neighbors, load_neighbors,
+    save_vectors, load_vectors, update_neighbors, build_neighbors_to_disk
 )
-
-print("TEXT FEATURES CREATED")
-
-# --------------------------------------------------
-# 8. VECTORIZATION
-# --------------------------------------------------
-
-vectorizer = TfidfVectorizer(
-    max_features=5000,
-    stop_words="english"
+from catalog import save_catalog
+from ann import DEFAULT_TABLES, MAX_BITS, TARGET_BUCKET_SIZE, LSHIndex
+from embedding import DEFAULT_DIMS, build_embedding, save_embedding
+from metric_scores import evaluate
+from ground_truth import GROUND_TRUTH_FILE, save_ground_truth
+from model_registry import (
+    CATALOG_FILE, BACKEND_FILES, new_build_dir, read_manifest, version_dir, write_manifest
 )
 
-vectors = vectorizer.fit_transform(df["tags"])
-
-# --------------------------------------------------
-# 9. SIMILARITY MATRIX
-# --------------------------------------------------
-
-similarity = cosine_similarity(vectors)
-
-# --------------------------------------------------
-# 10. SAVE MODEL ARTIFACTS (THIS CREATES PKLS)
-# --------------------------------------------------
-
-with open(MOVIE_PKL, "wb") as f:
-    pickle.dump(df, f)
-
-with open(SIM_PKL, "wb") as f:
-    pickle.dump(similarity, f)
-
-print()
-print("MODEL ARTIFACTS SAVED SUCCESSFULLY")
-print("Saved to:", MODEL_DIR)
-print("Total movies in model:", df.shape[0])
-print("Last 10 movies in model:")
-print(df[["id", "title"]].tail(10))
-
-import numpy as np
-
-
-# hit rate: “Does the recommended list contain a relevant movie?”
-def evaluate_hit_rate_at_k(similarity, k=5, sample_size=200):
-    hits = 0
-    total = 0
-
-    n = min(sample_size, similarity.shape[0])
-
-    for i in range(n):
-        scores = list(enumerate(similarity[i]))
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-
-        # ignore self (index 0)
-        recommended = [idx for idx, _ in scores[1:k+1]]
-
-        # assume top-1 similar movie is relevant
-        relevant = scores[1][0]
-
-        if relevant in recommended:
-            hits += 1
-        total += 1
-
-    return hits / total
-
-
-#precision: “Out of the recommended movies, how many are actually relevant?”
-def evaluate_precision_at_k(similarity, k=5, sample_size=200):
-    precision_sum = 0
-    n = min(sample_size, similarity.shape[0])
-
-    for i in range(n):
-        scores = list(enumerate(similarity[i]))
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-
-        recommended = [idx for idx, _ in scores[1:k+1]]
-        relevant = scores[1][0]
-
-        if relevant in recommended:
-            precision_sum += 1 / k
-
-    return precision_sum / n
-
-
-#Mean Reciprocal Rank (MRR): “How early does the relevant movie appear in recommendations?”
-def evaluate_mrr(similarity, sample_size=200):
-    rr_sum = 0
-    n = min(sample_size, similarity.shape[0])
-
-    for i in range(n):
-        scores = list(enumerate(similarity[i]))
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-
-        relevant = scores[1][0]
-
-        for rank, (idx, _) in enumerate(scores[1:], start=1):
-            if idx == relevant:
-                rr_sum += 1 / rank
-                break
-
-    return rr_sum / n
-
-print("Evaluating recommendation model...\n")
-
-hit_rate = evaluate_hit_rate_at_k(similarity, k=5, sample_size=200)
-precision = evaluate_precision_at_k(similarity, k=5, sample_size=200)
-mrr = evaluate_mrr(similarity, sample_size=200)
-
-print(f"Hit Rate@5      : {hit_rate:.4f}")
-print(f"Precision@5     : {precision:.4f}")
-print(f"MRR             : {mrr:.4f}")
+# rows scored by the post-build evaluation when it cannot be done in one
+# cheap pass: everything except an exact TF-IDF table needs an all-pairs
+# TF-IDF baseline (and LSH answers one query at a time)
+DEFAULT_EVAL_SAMPLE = 2000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild MoviMate model artifacts")
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=DEFAULT_TOP_K,
+        help="number of neighbors kept per movie (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="reuse the saved vectorizer and vectors; only new or changed movies "
+             "are vectorized and only the affected neighbor lists are recomputed"
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=None,
+        help="compute similarities in blocks of this many rows and stream the "
+             "top-K lists to disk; bounds peak memory by block size instead of N^2"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes used for the blocked neighbor build and catalog parsing "
+             "(default: %(default)s); output does not depend on this"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKEND_FILES),
+        default="exact",
+        help="exact: precomputed all-pairs top-K table; lsh: random-projection "
+             "LSH index queried at recommendation time, for very large catalogs; "
+             "embedding: brute-force dot products over the SVD embedding at "
+             "recommendation time (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--lsh-tables",
+        type=int,
+        default=DEFAULT_TABLES,
+        help="hash tables in the LSH index (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--lsh-bits",
+        type=int,
+        default=None,
+        help=f"hyperplanes per LSH table, at most {MAX_BITS} (default: "
+             f"log2(N / {TARGET_BUCKET_SIZE}) clipped to [4, {MAX_BITS}])"
+    )
+    parser.add_argument(
+        "--svd-dims",
+        type=int,
+        default=None,
+        help="project the TF-IDF vectors to this many dense dimensions with "
+             "TruncatedSVD (128-256 is typical) and compute similarities there; "
+             f"the embedding backend defaults to {DEFAULT_DIMS}"
+    )
+    parser.add_argument(
+        "--eval-sample",
+        type=int,
+        default=None,
+        help="movies scored by the evaluation after the build (default: all of "
+             f"them for an exact TF-IDF table, {DEFAULT_EVAL_SAMPLE} otherwise)"
+    )
+    parser.add_argument(
+        "--skip-eval",
+        action="store_true",
+        help="do not evaluate the new model; run metric_scores.py later instead"
+    )
+    args = parser.parse_args()
+
+    if args.backend == "embedding" and not args.svd_dims:
+        args.svd_dims = DEFAULT_DIMS
+
+    # the parallel build works block by block
+    if args.workers > 1 and not args.block_size:
+        args.block_size = DEFAULT_BLOCK_SIZE
+
+    # --------------------------------------------------
+    # 0. PATH SETUP (SINGLE SOURCE OF TRUTH)
+    # --------------------------------------------------
+
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+    DATASET_DIR = os.path.join(BASE_DIR, "Dataset")
+    MODEL_DIR = os.path.join(BASE_DIR, "model_files")
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    # the build being served, read by --incremental
+    previous_manifest = read_manifest(MODEL_DIR)
+    PREVIOUS_DIR = version_dir(MODEL_DIR, previous_manifest)
+
+    # everything is written to a fresh directory; running apps switch to it
+    # only when the manifest is replaced at the end
+    BUILD_DIR = new_build_dir(MODEL_DIR)
+
+    MOVIES_CSV = os.path.join(DATASET_DIR, "tmdb_5000_movies.csv")
+    CREDITS_CSV = os.path.join(DATASET_DIR, "tmdb_5000_credits.csv")
+
+    MOVIE_PKL = "movie_list.pkl"
+    VECTORIZER_PKL = "vectorizer.pkl"
+
+    print("REBUILD CWD:", os.getcwd())
+    print("USING MOVIES CSV:", MOVIES_CSV)
+    print("USING CREDITS CSV:", CREDITS_CSV)
+
+    # --------------------------------------------------
+    # 1. LOAD DATASETS
+    # --------------------------------------------------
+
+    movies = pd.read_csv(MOVIES_CSV, encoding="latin1", low_memory=False)
+    credits = pd.read_csv(CREDITS_CSV, encoding="latin1", low_memory=False)
+
+    print("CSV FILES LOADED SUCCESSFULLY")
+    print("Total movies in CSV:", movies.shape[0])
+    print("Last 10 movies in CSV:")
+    print(movies[["id", "title"]].tail(10))
+
+    # --------------------------------------------------
+    # 2. NORMALIZE ID COLUMNS
+    # --------------------------------------------------
+
+    movies["id"] = pd.to_numeric(movies["id"], errors="coerce")
+    credits["movie_id"] = pd.to_numeric(credits["movie_id"], errors="coerce")
+
+    movies = movies.dropna(subset=["id"])
+    credits = credits.dropna(subset=["movie_id"])
+
+    movies["id"] = movies["id"].astype(int)
+    credits["movie_id"] = credits["movie_id"].astype(int)
+
+    # --------------------------------------------------
+    # 3. DEDUPLICATION (SAFE, AFTER ID REPAIR)
+    # --------------------------------------------------
+
+    movies = movies.drop_duplicates(subset="id", keep="last")
+    credits = credits.drop_duplicates(subset="movie_id", keep="last")
+
+    print("After ID cleanup:")
+    print("Movies:", movies.shape[0])
+    print("Credits:", credits.shape[0])
+
+    # --------------------------------------------------
+    # 4. MERGE (LEFT JOIN — THIS IS THE FIX)
+    # --------------------------------------------------
+
+    df = movies.merge(
+        credits,
+        left_on="id",
+        right_on="movie_id",
+        how="left"
+    )
+
+    # fill missing credits safely
+    df["cast"] = df["cast"].fillna("[]")
+    df["crew"] = df["crew"].fillna("[]")
+
+    print("DATASETS MERGED SUCCESSFULLY")
+    print("Movies after merge:", df.shape[0])
+
+    # --------------------------------------------------
+    # 5. SELECT & RENAME COLUMNS
+    # --------------------------------------------------
+
+    columns = [
+        "id", "title_x", "overview", "genres", "keywords", "cast", "crew", "original_language",
+        "popularity", "vote_average", "vote_count", "release_date"
+    ]
+    # only in fuller TMDB exports; used by the evaluation ground truth
+    if "belongs_to_collection" in df.columns:
+        columns.append("belongs_to_collection")
+
+    df = df[columns]
+
+    df.rename(columns={"title_x": "title"}, inplace=True)
+
+    # --------------------------------------------------
+    # 6. FINAL CLEANUP
+    # --------------------------------------------------
+
+    NUMERIC_COLUMNS = ["popularity", "vote_average", "vote_count"]
+    df[NUMERIC_COLUMNS] = df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    df.fillna("", inplace=True)
+    df.drop_duplicates(subset="id", inplace=True)
+
+    # --------------------------------------------------
+    # 7. CREATE TAGS
+    # --------------------------------------------------
+
+    df["tags"] = (
+        df["overview"].astype(str) + " " +
+        df["genres"].astype(str) + " " +
+        df["keywords"].astype(str)
+    )
+
+    print("TEXT FEATURES CREATED")
+
+    # --------------------------------------------------
+    # 8. INCREMENTAL: DIFF AGAINST THE PREVIOUS BUILD
+    # --------------------------------------------------
+
+    previous_files = [MOVIE_PKL, VECTORIZER_PKL] + list(VECTORS_FILES.values())
+    if args.incremental and not all(os.path.exists(os.path.join(PREVIOUS_DIR, p)) for p in previous_files):
+        print("No previous build found, falling back to a full rebuild")
+        args.incremental = False
+
+    # incremental updates patch an exact TF-IDF neighbor table from the last
+    # build; an SVD basis is refit on every build
+    if args.incremental and (
+        args.backend != "exact" or args.svd_dims
+        or previous_manifest.get("backend", "exact") != "exact"
+        or previous_manifest.get("space", "tfidf") != "tfidf"
+    ):
+        print("Incremental builds need the exact backend over TF-IDF, falling back to a full rebuild")
+        args.incremental = False
+
+    if args.incremental:
+        with open(os.path.join(PREVIOUS_DIR, MOVIE_PKL), "rb") as f:
+            old_df = pickle.load(f)
+
+        old_row_by_id = {movie_id: row for row, movie_id in enumerate(old_df["id"])}
+        old_tags = old_df["tags"].to_numpy()
+
+        # old row of every new row (-1 = new movie); dirty = new or retagged
+        new_to_old = np.array([old_row_by_id.get(movie_id, -1) for movie_id in df["id"]])
+        dirty = new_to_old < 0
+        dirty[~dirty] = old_tags[new_to_old[~dirty]] != df["tags"].to_numpy()[~dirty]
+        dirty_rows = np.flatnonzero(dirty)
+
+        old_to_new = np.full(len(old_df), -1)
+        old_to_new[new_to_old[new_to_old >= 0]] = np.flatnonzero(new_to_old >= 0)
+
+        new_ids = df["id"].to_numpy()
+        added_ids = new_ids[dirty & (new_to_old < 0)]
+        changed_ids = new_ids[dirty & (new_to_old >= 0)]
+        removed_ids = old_df["id"].to_numpy()[old_to_new < 0]
+
+        print("Added movies:", len(added_ids))
+        print("Changed movies:", len(changed_ids))
+        print("Removed movies:", len(removed_ids))
+
+    # --------------------------------------------------
+    # 9. VECTORIZATION
+    # --------------------------------------------------
+
+    if args.incremental:
+        # fixed vocabulary and IDF weights from the last full build
+        with open(os.path.join(PREVIOUS_DIR, VECTORIZER_PKL), "rb") as f:
+            vectorizer = pickle.load(f)
+        old_vectors = load_vectors(PREVIOUS_DIR, mmap=False)
+
+        if len(dirty_rows):
+            fresh = vectorizer.transform(df["tags"].iloc[dirty_rows]).astype(np.float32)
+        else:
+            fresh = sp.csr_matrix((0, old_vectors.shape[1]), dtype=np.float32)
+        source = new_to_old.copy()
+        source[dirty_rows] = old_vectors.shape[0] + np.arange(len(dirty_rows))
+        vectors = sp.vstack([old_vectors, fresh]).tocsr()[source]
+    else:
+        vectorizer = TfidfVectorizer(
+            max_features=5000,
+            stop_words="english"
+        )
+
+        vectors = vectorizer.fit_transform(df["tags"]).astype(np.float32)
+
+    # --------------------------------------------------
+    # 9b. OPTIONAL SVD EMBEDDING
+    # --------------------------------------------------
+
+    # similarities below are computed in this space
+    space = "tfidf"
+    space_vectors = vectors
+
+    if args.svd_dims:
+        embedding, explained = build_embedding(vectors, args.svd_dims)
+        space = "svd"
+        space_vectors = embedding
+
+        print("SVD EMBEDDING CREATED")
+        print("Dimensions:", embedding.shape[1], f"Explained variance: {explained:.3f}")
+
+    # --------------------------------------------------
+    # 10. TOP-K NEIGHBOR INDEX
+    # --------------------------------------------------
+
+    if args.backend == "lsh":
+        # no N x N work at all; neighbors are looked up at query time
+        ann_index = LSHIndex.build(space_vectors, n_tables=args.lsh_tables, n_bits=args.lsh_bits)
+        ann_index.save(BUILD_DIR)
+        build_info = {
+            "mode": "full",
+            "lsh_tables": ann_index.planes.shape[0],
+            "lsh_bits": ann_index.planes.shape[2],
+        }
+        neighbor_indices = None
+
+        print("LSH INDEX CREATED")
+        print("Tables:", build_info["lsh_tables"], "Bits per table:", build_info["lsh_bits"])
+    elif args.backend == "embedding":
+        # neighbors are one matrix-vector product at query time
+        build_info = {"mode": "full"}
+        neighbor_indices = None
+    elif args.incremental:
+        old_indices, old_scores = load_neighbors(PREVIOUS_DIR, mmap=False)
+        neighbor_indices, neighbor_scores, recomputed = update_neighbors(
+            vectors, old_indices, old_scores, old_to_new, dirty_rows, k=args.top_k
+        )
+
+        # rows whose recommendation list differs from the previous build
+        remapped = np.full((len(df), old_indices.shape[1]), -1)
+        kept = new_to_old >= 0
+        remapped[kept] = old_to_new[old_indices[new_to_old[kept]]]
+        width = min(remapped.shape[1], neighbor_indices.shape[1])
+        updated = (remapped[:, :width] != neighbor_indices[:, :width]).any(axis=1) | ~kept
+        build_info = {
+            "mode": "incremental",
+            "added_ids": added_ids.tolist(),
+            "changed_ids": changed_ids.tolist(),
+            "removed_ids": removed_ids.tolist(),
+            "neighbors_updated_ids": new_ids[updated].tolist(),
+        }
+
+        print("Neighbor lists recomputed:", len(recomputed))
+        print("Neighbor lists changed:", int(updated.sum()))
+    elif args.block_size:
+        # written to the build directory as it is computed; no N x N matrix in memory
+        build_neighbors_to_disk(
+            BUILD_DIR, space_vectors, k=args.top_k, block_size=args.block_size, workers=args.workers
+        )
+        neighbor_indices, neighbor_scores = load_neighbors(BUILD_DIR)
+        build_info = {"mode": "full", "block_size": args.block_size}
+    else:
+        neighbor_indices, neighbor_scores = top_k_rows(cosine_similarity(space_vectors), k=args.top_k)
+        build_info = {"mode": "full"}
+
+    if neighbor_indices is not None:
+        print("NEIGHBOR INDEX CREATED")
+        print("Neighbors per movie:", neighbor_indices.shape[1])
+
+    # --------------------------------------------------
+    # 11. SAVE MODEL ARTIFACTS (THIS CREATES PKLS)
+    # --------------------------------------------------
+
+    with open(os.path.join(BUILD_DIR, MOVIE_PKL), "wb") as f:
+        pickle.dump(df, f)
+
+    # kept for the next --incremental build
+    with open(os.path.join(BUILD_DIR, VECTORIZER_PKL), "wb") as f:
+        pickle.dump(vectorizer, f)
+    save_vectors(BUILD_DIR, vectors)
+
+    if args.svd_dims:
+        save_embedding(BUILD_DIR, embedding)
+        build_info["svd_dims"] = embedding.shape[1]
+        build_info["svd_explained_variance"] = round(explained, 4)
+
+    if neighbor_indices is not None and (not args.block_size or args.incremental):
+        save_neighbors(BUILD_DIR, neighbor_indices, neighbor_scores)
+
+    # lean, app-facing copy: ids, titles, genre bitmask, language
+    save_catalog(os.path.join(BUILD_DIR, CATALOG_FILE), df, workers=args.workers)
+
+    # evaluation only: director / top cast / keyword / collection relations
+    save_ground_truth(os.path.join(BUILD_DIR, GROUND_TRUTH_FILE), df)
+
+    # written last: running apps pick up the new version from the manifest
+    manifest = write_manifest(MODEL_DIR, BUILD_DIR, backend=args.backend, space=space, extra={"build": build_info})
+
+    print()
+    print("MODEL ARTIFACTS SAVED SUCCESSFULLY")
+    print("Saved to:", BUILD_DIR)
+    print("Model version:", manifest["version"])
+    print("Total movies in model:", df.shape[0])
+    print("Last 10 movies in model:")
+    print(df[["id", "title"]].tail(10))
+
+    # --------------------------------------------------
+    # 12. EVALUATION
+    # --------------------------------------------------
+
+    if args.skip_eval:
+        return
+
+    # an exact TF-IDF table is its own baseline, so scoring it all is cheap
+    sample_size = args.eval_sample
+    if sample_size is None and (args.backend != "exact" or space != "tfidf"):
+        sample_size = DEFAULT_EVAL_SAMPLE
+    report = evaluate(MODEL_DIR, sample_size=sample_size)
+
+    print()
+    print("EVALUATION:")
+    print(json.dumps(report["metrics"], indent=2))
+
+
+if __name__ == "__main__":
+    # --workers starts process pools; spawned workers re-import this module
+    main()
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from ann import DEFAULT_TABLES, DEFAULT_PROBES, DEFAULT_MAX_CANDIDATES
+from neighbors import filter_candidates
+from model_registry import load_artifacts
+from tmdb_client import (
+    TMDBClient,
+    TMDBCache,
+    DAY,
+    sqlite_connection,
+    poster_path_from_bundle,
+    trailer_key_from_bundle,
+)
+
+# --------------------------------------------------
+# PRECOMPUTED RECOMMENDATION PAYLOADS
+# --------------------------------------------------
+# An offline warm-up job writes one ready-to-render record per movie:
+# the recommended ids with their titles, poster paths and trailer keys.
+# recommend() in app.py reads it with one primary-key lookup and only
+# falls back to neighbor search + TMDB fetches on a miss.
+#
+# A record is valid for the model version it was built with and for
+# MAX_AGE after its TMDB data was fetched. Re-running the job is
+# incremental: fresh records are skipped, records whose candidate list
+# did not change in a new model version are re-stamped without any TMDB
+# call, and only the rest are rebuilt.
+#
+#   python recommendation_cache.py --top-n 5000
+#   python recommendation_cache.py --all --max-age-days 3
+
+STORE_PATH = os.environ.get(
+    "RECOMMENDATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "recommendations.sqlite"),
+)
+
+RECOMMENDATIONS = 5  # cards per details page
+MAX_AGE = 7 * DAY  # same as TMDB movie/ responses
+DEFAULT_TOP_N = 5000
+DEFAULT_WORKERS = 4  # movies built at once, each fetching its candidates concurrently
+WRITE_BATCH = 500
+
+
+def candidate_ids(model, row, **search):
+    # best-first TMDB ids the details page may recommend for `row`
+    rows = filter_candidates(model.similar_rows(row, **search), model.title_codes, model.title_codes[row])
+    return model.movie_ids[rows]
+
+
+def candidates_digest(candidates):
+    return hashlib.sha1(np.asarray(candidates, dtype=np.int64).tobytes()).hexdigest()[:16]
+
+
+def build_records(model, tmdb, candidates):
+    # Returns (records, complete). A record is [id, title, poster_path,
+    # trailer_key]; candidates without a poster are skipped. complete is
+    # False when a failed fetch may have hidden a better candidate.
+    records = []
+    complete = True
+
+    for movie_id, bundle in tmdb.iter_bundles(candidates):
+        if bundle is None:
+            complete = False
+            continue
+        poster_path = poster_path_from_bundle(bundle)
+        if not poster_path:
+            continue
+        title = model.movies["title"].iat[model.id_to_row[movie_id]]
+        records.append([movie_id, title, poster_path, trailer_key_from_bundle(bundle)])
+
+        if len(records) == RECOMMENDATIONS:
+            return records, True
+
+    return records, complete
+
+
+# --------------------------------------------------
+# LOCAL STORE
+# --------------------------------------------------
+# One SQLite file shared by every Streamlit worker on the host, opened
+# the same way as the TMDB response cache.
+
+class RecommendationStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS recommendations (
+                movie_id INTEGER PRIMARY KEY,
+                model_version TEXT NOT NULL,
+                candidates TEXT NOT NULL,
+                records TEXT NOT NULL,
+                built_at REAL NOT NULL
+            )
+        """)
+
+    def _conn(self):
+        return sqlite_connection(self._local, self.path)
+
+    def get(self, movie_id, model_version, max_age=MAX_AGE):
+        # records for `movie_id`, or None when missing or stale
+        row = self._conn().execute(
+            "SELECT records FROM recommendations "
+            "WHERE movie_id = ? AND model_version = ? AND built_at >= ?",
+            (int(movie_id), model_version, time.time() - max_age),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def entries(self):
+        # movie_id -> (model_version, candidates digest, built_at)
+        rows = self._conn().execute(
+            "SELECT movie_id, model_version, candidates, built_at FROM recommendations"
+        )
+        return {movie_id: entry for movie_id, *entry in rows}
+
+    def put(self, movie_id, model_version, digest, records):
+        self.put_many([(movie_id, model_version, digest, records)])
+
+    def put_many(self, items, built_at=None):
+        built_at = built_at or time.time()
+        self._executemany(
+            "INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?, ?)",
+            [
+                (int(movie_id), version, digest, json.dumps(records), built_at)
+                for movie_id, version, digest, records in items
+            ],
+        )
+
+    def restamp(self, movie_ids, model_version):
+        # same candidates in a new model version: keep records and built_at
+        self._executemany(
+            "UPDATE recommendations SET model_version = ? WHERE movie_id = ?",
+            [(model_version, int(movie_id)) for movie_id in movie_ids],
+        )
+
+    def prune(self, keep_ids):
+        # drop movies that are no longer in the catalog
+        keep_ids = set(int(movie_id) for movie_id in keep_ids)
+        gone = [(movie_id,) for movie_id in self.entries() if movie_id not in keep_ids]
+        self._executemany("DELETE FROM recommendations WHERE movie_id = ?", gone)
+        return len(gone)
+
+    def _executemany(self, sql, rows):
+        if not rows:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(sql, rows)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+# --------------------------------------------------
+# WARM-UP JOB
+# --------------------------------------------------
+
+def popular_movie_ids(model, top_n=None):
+    # catalog ids, most popular first; all of them when top_n is None
+    order = np.argsort(-model.movies["popularity"].to_numpy(), kind="stable")
+    return model.movie_ids[order[:top_n]]
+
+
+def warm(model, tmdb, store, movie_ids, max_age=MAX_AGE, force=False, workers=DEFAULT_WORKERS, **search):
+    now = time.time()
+    existing = store.entries()
+    stats = {"fresh": 0, "restamped": 0, "built": 0, "failed": 0}
+
+    restamp = []
+    todo = []
+    for movie_id in movie_ids:
+        movie_id = int(movie_id)
+        entry = existing.get(movie_id)
+        recent = entry is not None and not force and entry[2] >= now - max_age
+        if recent and entry[0] == model.version:
+            stats["fresh"] += 1
+            continue
+
+        candidates = candidate_ids(model, model.id_to_row[movie_id], **search)
+        digest = candidates_digest(candidates)
+        if recent and entry[1] == digest:
+            restamp.append(movie_id)
+        else:
+            todo.append((movie_id, candidates, digest))
+
+    store.restamp(restamp, model.version)
+    stats["restamped"] = len(restamp)
+    print(f"{stats['fresh']} fresh, {len(restamp)} re-stamped, {len(todo)} to build")
+
+    def build(item):
+        movie_id, candidates, digest = item
+        records, complete = build_records(model, tmdb, candidates)
+        return movie_id, digest, records, complete
+
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for done, (movie_id, digest, records, complete) in enumerate(pool.map(build, todo), 1):
+            if complete:
+                batch.append((movie_id, model.version, digest, records))
+                stats["built"] += 1
+            else:
+                # retried on the next run; the app computes it live meanwhile
+                stats["failed"] += 1
+
+            if len(batch) >= WRITE_BATCH or done == len(todo):
+                store.put_many(batch)
+                batch = []
+                print(f"  {done}/{len(todo)} built")
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute recommendation payloads")
+    which = parser.add_mutually_exclusive_group()
+    which.add_argument("--top-n", type=int, default=DEFAULT_TOP_N, help="most popular movies to warm")
+    which.add_argument("--all", action="store_true", help="warm the whole catalog")
+    parser.add_argument("--model-dir", default="model_files")
+    parser.add_argument("--max-age-days", type=float, default=MAX_AGE / DAY)
+    parser.add_argument("--force", action="store_true", help="rebuild fresh records too")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    # app.py's ANN_SEARCH uses the same ann.py defaults; keep the two equal
+    # when overriding them for an --backend lsh model
+    parser.add_argument("--n-tables", type=int, default=DEFAULT_TABLES)
+    parser.add_argument("--n-probes", type=int, default=DEFAULT_PROBES)
+    parser.add_argument("--max-candidates", type=int, default=DEFAULT_MAX_CANDIDATES)
+    parser.add_argument("--api-key", default=os.environ.get("TMDB_API_KEY"))
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("set TMDB_API_KEY or pass --api-key")
+
+    start = time.perf_counter()
+    model = load_artifacts(args.model_dir)
+    tmdb = TMDBClient(args.api_key, cache=TMDBCache())
+    store = RecommendationStore()
+
+    pruned = store.prune(model.movie_ids)
+    stats = warm(
+        model,
+        tmdb,
+        store,
+        popular_movie_ids(model, None if args.all else args.top_n),
+        max_age=args.max_age_days * DAY,
+        force=args.force,
+        workers=args.workers,
+        n_tables=args.n_tables,
+        n_probes=args.n_probes,
+        max_candidates=args.max_candidates,
+    )
+    print(json.dumps({
+        "model_version": model.version,
+        **stats,
+        "pruned": pruned,
+        "seconds": round(time.perf_counter() - start, 1),
+    }, indent=2))
@@ -0,0 +1,154 @@
+import re
+import bisect
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------
+# TYPO-TOLERANT TITLE SEARCH
+# --------------------------------------------------
+# Built once per model version, so the search box only ever sends the
+# current query's matches to the browser instead of every title.
+#
+# Titles are normalised (accents stripped, lower case, punctuation to
+# spaces) and matched two ways:
+#   prefix  bisect over the sorted normalised titles; exact title first,
+#           then by popularity
+#   fuzzy   trigram postings; titles are ranked by the share of the query's
+#           trigrams they contain, then by Jaccard similarity (shorter,
+#           closer titles first), so typos and partly typed words match
+# Both are array operations over posting lists, not a scan of the catalog.
+
+DEFAULT_LIMIT = 10
+MIN_COVERAGE = 0.5  # share of the query's trigrams a fuzzy match must have
+
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    text = str(text)
+    if not text.isascii():
+        text = _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _padded(text):
+    # padding makes word starts / ends their own trigrams
+    return " " + text + " "
+
+
+class TitleIndex:
+    def __init__(self, titles, years, movie_ids, popularity):
+        self.titles = list(titles)
+        self.years = np.asarray(years)
+        self.movie_ids = np.asarray(movie_ids)
+        self.popularity = np.asarray(popularity, dtype=np.float32)
+        n = len(self.titles)
+
+        normalized = [normalize(t) for t in self.titles]
+
+        # prefix lookup
+        self.sorted_rows = np.array(
+            sorted(range(n), key=normalized.__getitem__), dtype=np.int32
+        )
+        self.sorted_titles = [normalized[i] for i in self.sorted_rows]
+        self.normalized = normalized
+
+        # trigram postings, built with array ops over all titles at once
+        padded = [_padded(t) for t in normalized]
+        lengths = np.array([len(p) for p in padded], dtype=np.int64)
+        chars = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32)
+        self.alphabet, codes = np.unique(chars, return_inverse=True)
+        size = len(self.alphabet)
+
+        # a trigram starting at `at` must end inside the same title
+        ends = np.repeat(np.cumsum(lengths), lengths)
+        at = np.flatnonzero(np.arange(len(chars)) + 3 <= ends)
+        codes = codes.astype(np.int64)
+        trigrams = (codes[at] * size + codes[at + 1]) * size + codes[at + 2]
+        rows = np.repeat(np.arange(n), lengths)[at]
+
+        # distinct (trigram, row) pairs, grouped by trigram (sorted once)
+        pairs = np.sort(trigrams * n + rows)
+        pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])] if len(pairs) else pairs
+        self.postings = (pairs % max(n, 1)).astype(np.int32)
+        pair_trigrams = pairs // max(n, 1)
+        first = np.flatnonzero(np.append(True, pair_trigrams[1:] != pair_trigrams[:-1]))
+        first = first if len(pairs) else first[:0]
+        self.trigrams = pair_trigrams[first]
+        self.offsets = np.append(first, len(pairs))
+        self.trigram_counts = np.bincount(self.postings, minlength=n)
+
+        # titles sharing a release year with another movie of the same name
+        key = pd.Series(normalized) + "|" + pd.Series(self.years).astype(str)
+        self.ambiguous = key.duplicated(keep=False).to_numpy()
+
+    @classmethod
+    def from_movies(cls, movies):
+        return cls(movies["title"], movies["year"], movies["id"], movies["popularity"])
+
+    def label(self, row):
+        # what the search box shows: title, year, and the id if still ambiguous
+        label = self.titles[row]
+        if self.years[row]:
+            label += f" ({self.years[row]})"
+        if self.ambiguous[row]:
+            label += f" · #{self.movie_ids[row]}"
+        return label
+
+    def _most_popular(self, rows, limit):
+        if len(rows) > limit:
+            rows = rows[np.argpartition(-self.popularity[rows], limit)[:limit]]
+        return rows[np.argsort(-self.popularity[rows], kind="stable")]
+
+    def _prefix(self, query, limit):
+        # exact titles first, then longer titles starting with the query
+        lo = bisect.bisect_left(self.sorted_titles, query)
+        mid = bisect.bisect_right(self.sorted_titles, query, lo)
+        hi = bisect.bisect_left(self.sorted_titles, query + "\U0010ffff", mid)
+        return np.concatenate([
+            self._most_popular(self.sorted_rows[lo:mid], limit),
+            self._most_popular(self.sorted_rows[mid:hi], limit),
+        ])
+
+    def _fuzzy(self, query, limit):
+        chars = np.frombuffer(_padded(query).encode("utf-32-le"), dtype=np.uint32)
+        size = len(self.alphabet)
+        codes = np.minimum(np.searchsorted(self.alphabet, chars), max(size - 1, 0))
+        known = self.alphabet[codes] == chars if size else np.zeros(len(chars), dtype=bool)
+
+        codes = codes.astype(np.int64)
+        grams = (codes[:-2] * size + codes[1:-1]) * size + codes[2:]
+        query_count = len(np.unique(grams))
+
+        # trigrams with a character no title contains cannot match anything
+        grams = np.unique(grams[known[:-2] & known[1:-1] & known[2:]])
+        slots = np.minimum(np.searchsorted(self.trigrams, grams), max(len(self.trigrams) - 1, 0))
+        slots = slots[self.trigrams[slots] == grams] if len(self.trigrams) else slots[:0]
+        if len(slots) == 0:
+            return np.empty(0, dtype=np.int32)
+
+        hits = np.concatenate([self.postings[self.offsets[s]:self.offsets[s + 1]] for s in slots])
+        shared = np.bincount(hits, minlength=len(self.titles))
+        rows = np.flatnonzero(shared >= MIN_COVERAGE * query_count)
+        shared = shared[rows]
+        coverage = shared / query_count
+        jaccard = shared / (query_count + self.trigram_counts[rows] - shared)
+
+        # coverage steps are >= 1 / query_count, so jaccard only breaks ties
+        scores = coverage + jaccard / 1000
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            rows, scores = rows[top], scores[top]
+        return rows[np.lexsort((-self.popularity[rows], -scores))]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        # best-first catalog rows matching `query`
+        query = normalize(query)
+        if not query:
+            return np.empty(0, dtype=np.int32)
+
+        rows = np.concatenate([self._prefix(query, limit), self._fuzzy(query, limit)])
+        _, first = np.unique(rows, return_index=True)
+        return rows[np.sort(first)][:limit].astype(np.int32)
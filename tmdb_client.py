@@ -0,0 +1,591 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+# --------------------------------------------------
+# CONFIGURATION
+# --------------------------------------------------
+# TMDB_BASE_URL can point at a local stub server (see benchmarks/tmdb_stub.py)
+
+TMDB_BASE_URL = os.environ.get("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.environ.get(
+    "TMDB_CACHE_PATH", os.path.join(BASE_DIR, "cache", "tmdb_cache.sqlite")
+)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# first matching pattern wins
+ENDPOINT_TTLS = [
+    (r"^trending/", 1 * HOUR),
+    (r"/watch/providers$", 6 * HOUR),
+    (r"^search/", 1 * DAY),
+    (r"^movie/", 7 * DAY),
+]
+DEFAULT_TTL = 1 * DAY
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+EVICT_EVERY = 100  # writes between LRU eviction passes
+MEMORY_ENTRIES = 512  # per-process hot entries kept decoded in memory
+MAX_CONCURRENT_REQUESTS = 8  # per-process cap on parallel TMDB fetches
+
+# Background prefetching of likely next clicks. It has its own threads and
+# a per-process request budget well below TMDB's rate limit, so it never
+# takes pool slots or rate from renders.
+PREFETCH_WORKERS = 2
+PREFETCH_PER_OWNER = 16  # a session's least likely ids are dropped beyond this
+PREFETCH_QUEUE_SIZE = 64  # all sessions; trimmed from the longest queue's tail
+PREFETCH_RATE = 5.0  # TMDB requests per second, all sessions together
+PREFETCH_BURST = 10
+
+# HTTP behaviour: one keep-alive connection pool per process, short
+# per-request timeouts, a few quick retries, and TMDB's Retry-After
+# honoured on 429 without ever outliving the current page render.
+REQUEST_TIMEOUT = (3.05, 5)  # (connect, read) seconds
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.25  # 0.25s, 0.5s, 1s
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_AFTER = 30
+RENDER_DEADLINE = 8.0  # seconds of TMDB time allowed per page render
+
+# Circuit breaker: once this many fetches in a row have used up their
+# retries, TMDB is treated as down and get() answers from the cache only,
+# so renders stop spending their whole deadline on it. After
+# CIRCUIT_OPEN_SECONDS one request is let through to probe; a success
+# closes the circuit again.
+CIRCUIT_FAILURES = 5
+CIRCUIT_OPEN_SECONDS = 30
+
+# everything the details view needs, in one /movie/{id} request
+BUNDLE_APPENDS = "credits,videos,watch/providers,images"
+BUNDLE_IMAGE_LANGUAGES = "en,null"
+
+
+def bundle_request(movie_id):
+    return f"movie/{int(movie_id)}", {
+        "append_to_response": BUNDLE_APPENDS,
+        "include_image_language": BUNDLE_IMAGE_LANGUAGES,
+    }
+
+
+def _path_ttl(path):
+    for pattern, ttl in ENDPOINT_TTLS:
+        if re.search(pattern, path):
+            return ttl
+    return DEFAULT_TTL
+
+
+def ttl_for(path, params=None):
+    # an append_to_response payload is only as fresh as its shortest-lived part
+    ttl = _path_ttl(path)
+    appends = (params or {}).get("append_to_response", "")
+    for part in filter(None, appends.split(",")):
+        ttl = min(ttl, _path_ttl(f"{path}/{part}"))
+    return ttl
+
+
+def cache_key(path, params):
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    return f"{path}?{query}"
+
+
+def pooled_session(pool_size=MAX_CONCURRENT_REQUESTS):
+    # retries are handled in TMDBClient.get so they can respect deadlines
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def retry_after_seconds(response):
+    # Retry-After may be delta-seconds or an HTTP date
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# --------------------------------------------------
+# MOVIE BUNDLE FIELDS
+# --------------------------------------------------
+# Raw TMDB values (image path, YouTube key) rather than URLs, so they can be
+# stored compactly and expanded by whoever renders them.
+
+def poster_path_from_bundle(data):
+    # the movie's poster, else the first one in its image list
+    if not data:
+        return None
+    poster_path = data.get("poster_path")
+    if not poster_path:
+        posters = (data.get("images") or {}).get("posters") or []
+        poster_path = posters[0].get("file_path") if posters else None
+    return poster_path or None
+
+
+def trailer_key_from_bundle(data):
+    # YouTube key of the first trailer
+    for video in ((data or {}).get("videos") or {}).get("results", []):
+        if video.get("type") == "Trailer" and video.get("site") == "YouTube":
+            return video.get("key")
+    return None
+
+
+# --------------------------------------------------
+# RENDER DEADLINE
+# --------------------------------------------------
+# A context-local absolute deadline. app.py sets it at the top of every
+# script run; fetches submitted to the pool inherit it, so one slow
+# endpoint cannot stall a render for longer than RENDER_DEADLINE.
+
+_deadline = contextvars.ContextVar("tmdb_deadline", default=None)
+
+
+def set_render_deadline(seconds=RENDER_DEADLINE):
+    _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+@contextmanager
+def render_deadline(seconds=RENDER_DEADLINE):
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _remaining():
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+# --------------------------------------------------
+# PERSISTENT RESPONSE CACHE
+# --------------------------------------------------
+# One SQLite file shared by every session and every Streamlit worker
+# process on the host. WAL mode lets readers run while another process
+# writes; each thread gets its own connection.
+
+def sqlite_connection(local, path):
+    # this thread's connection to `path`, kept on the threading.local `local`
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        local.conn = conn
+    return conn
+
+
+class TMDBCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+        )
+
+    def _conn(self):
+        return sqlite_connection(self._local, self.path)
+
+    def _remember(self, key, value, expires_at):
+        with self._memory_lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+
+        with self._memory_lock:
+            hit = self._memory.get(key)
+            if hit is not None and hit[1] >= now:
+                self._memory.move_to_end(key)
+                return hit[0]
+
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT body, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None or row[1] < now:
+            return None
+
+        # coarse LRU bookkeeping: at most one write per key per minute
+        conn.execute(
+            "UPDATE responses SET accessed_at = ? WHERE key = ? AND accessed_at < ?",
+            (now, key, now - 60),
+        )
+        value = json.loads(row[0])
+        self._remember(key, value, row[1])
+        return value
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        body = json.dumps(value)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (key, body, len(body), now + ttl, now),
+        )
+        self._remember(key, value, now + ttl)
+
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        # drop expired entries, then least recently used ones past max_bytes
+        conn = self._conn()
+        conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        conn.execute("""
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (
+                        ORDER BY accessed_at DESC, key
+                    ) AS running
+                    FROM responses
+                )
+                WHERE running > ?
+            )
+        """, (self.max_bytes,))
+
+
+# --------------------------------------------------
+# TMDB CLIENT
+# --------------------------------------------------
+
+class TMDBClient:
+    def __init__(
+        self,
+        api_key,
+        base_url=TMDB_BASE_URL,
+        cache=None,
+        max_workers=MAX_CONCURRENT_REQUESTS,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.max_workers = max_workers
+        self.session = pooled_session(max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tmdb")
+        # set after a 429 so every thread backs off together
+        self._blocked_until = 0.0
+        # consecutive fetches that exhausted their retries
+        self._failures = 0
+        self._open_until = 0.0
+        self._circuit_lock = threading.Lock()
+
+    def get(self, path, **params):
+        # returns the decoded JSON payload, or None on any failure
+        path = path.strip("/")
+        key = cache_key(path, params)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not self._circuit_allows():
+            return None
+        response = self._request(path, params)
+        if response is None:
+            return None
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            print("TMDB ERROR:", path, e)
+            return None
+        if self.cache is not None:
+            self.cache.set(key, data, ttl_for(path, params))
+        return data
+
+    def _wait(self, seconds):
+        # sleeps unless that would overrun the render deadline
+        remaining = _remaining()
+        if remaining is not None and seconds >= remaining:
+            return False
+        if seconds > 0:
+            time.sleep(seconds)
+        return True
+
+    def _circuit_allows(self):
+        # closed, or open and due for a single probe request
+        with self._circuit_lock:
+            if self._failures < CIRCUIT_FAILURES:
+                return True
+            now = time.monotonic()
+            if now < self._open_until:
+                return False
+            # everyone else keeps waiting while this request probes
+            self._open_until = now + CIRCUIT_OPEN_SECONDS
+            return True
+
+    def _record_result(self, ok):
+        with self._circuit_lock:
+            if ok:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= CIRCUIT_FAILURES:
+                if self._failures == CIRCUIT_FAILURES:
+                    print("TMDB CIRCUIT OPEN: skipping requests for", CIRCUIT_OPEN_SECONDS, "s")
+                self._open_until = time.monotonic() + CIRCUIT_OPEN_SECONDS
+
+    def _request(self, path, params):
+        url = f"{self.base_url}/{path}"
+        params = {"api_key": self.api_key, **params}
+
+        for attempt in range(MAX_RETRIES + 1):
+            if not self._wait(self._blocked_until - time.monotonic()):
+                print("TMDB DEADLINE EXCEEDED:", path)
+                return None
+
+            timeout = REQUEST_TIMEOUT
+            remaining = _remaining()
+            if remaining is not None:
+                if remaining <= 0:
+                    print("TMDB DEADLINE EXCEEDED:", path)
+                    return None
+                timeout = tuple(min(t, remaining) for t in REQUEST_TIMEOUT)
+
+            response = None
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except requests.RequestException as e:
+                print("TMDB ERROR:", path, e)
+            else:
+                # any answer but a retryable error means TMDB is up
+                if response.status_code == 200:
+                    self._record_result(True)
+                    return response
+                if response.status_code not in RETRY_STATUSES:
+                    self._record_result(True)
+                    return None
+
+            # other fetches tripped the breaker meanwhile: stop retrying
+            if attempt == MAX_RETRIES or self._failures >= CIRCUIT_FAILURES:
+                break
+
+            delay = BACKOFF_FACTOR * (2 ** attempt)
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                delay = min(retry_after, MAX_RETRY_AFTER)
+                if response.status_code == 429:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                    delay = 0
+
+            if not self._wait(delay):
+                print("TMDB DEADLINE EXCEEDED:", path)
+                return None
+
+        self._record_result(False)
+        return None
+
+    def movie_bundle(self, movie_id):
+        # details + credits + videos + watch/providers + images, one round-trip
+        path, params = bundle_request(movie_id)
+        return self.get(path, **params)
+
+    def has_bundle(self, movie_id):
+        # cache lookup only, never a network request
+        if self.cache is None:
+            return False
+        path, params = bundle_request(movie_id)
+        return self.cache.get(cache_key(path, params)) is not None
+
+    # --------------------------------------------------
+    # CONCURRENT FETCHING
+    # --------------------------------------------------
+
+    def iter_bundles(self, movie_ids, lookahead=None):
+        # Yields (movie_id, bundle) in the given order while up to `lookahead`
+        # later ids are already being fetched on the shared pool. Stop
+        # iterating early and the not-yet-started fetches are cancelled.
+        movie_ids = [int(movie_id) for movie_id in movie_ids]
+        lookahead = lookahead or self.max_workers
+        pending = deque()
+        next_i = 0
+
+        try:
+            while pending or next_i < len(movie_ids):
+                while next_i < len(movie_ids) and len(pending) < lookahead:
+                    movie_id = movie_ids[next_i]
+                    # copy_context so pool threads see the caller's render deadline
+                    future = self._pool.submit(
+                        contextvars.copy_context().run, self.movie_bundle, movie_id
+                    )
+                    pending.append((movie_id, future))
+                    next_i += 1
+
+                movie_id, future = pending.popleft()
+                yield movie_id, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def fetch_bundles(self, movie_ids):
+        # {movie_id: bundle or None}, fetched concurrently
+        return dict(self.iter_bundles(movie_ids))
+
+
+# --------------------------------------------------
+# BACKGROUND PREFETCHER
+# --------------------------------------------------
+# Warms the cache with the bundles a session is likely to open next (its
+# recommendation cards, history, favourites, the next genre page) while
+# the user reads the current page. Ids are queued per owner (one per
+# browser session), most likely first, and owners are served round-robin.
+# A full queue drops ids from the low-priority tail: the owner's own beyond
+# PREFETCH_PER_OWNER, then the longest queue's. A new script run cancels
+# the owner's queued ids, so navigating away never leaves stale work in
+# front of anyone else's.
+# Cached bundles cost nothing; every network fetch takes one token from
+# the shared budget first.
+
+class RateBudget:
+    # token bucket: `rate` tokens per second, at most `burst` saved up
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        client,
+        workers=PREFETCH_WORKERS,
+        max_per_owner=PREFETCH_PER_OWNER,
+        max_queued=PREFETCH_QUEUE_SIZE,
+        rate=PREFETCH_RATE,
+        burst=PREFETCH_BURST,
+    ):
+        self.client = client
+        self.max_per_owner = max_per_owner
+        self.max_queued = max_queued
+        self.budget = RateBudget(rate, burst)
+        self.stats = {"queued": 0, "dropped": 0, "cancelled": 0, "cached": 0, "fetched": 0}
+        # owner -> its ids, most likely first; owners are served round-robin
+        self._queues = OrderedDict()
+        self._queued = 0
+        self._ready = threading.Condition()
+
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"tmdb-prefetch-{i}", daemon=True).start()
+
+    def submit(self, owner, movie_ids):
+        # queue ids in priority order behind the owner's earlier ones; when
+        # full, the least likely ids (the tail) are dropped first
+        with self._ready:
+            queue = self._queues.pop(owner, deque())
+            queued = set(queue)
+            for movie_id in map(int, movie_ids):
+                if movie_id not in queued:
+                    queue.append(movie_id)
+                    queued.add(movie_id)
+                    self._queued += 1
+                    self.stats["queued"] += 1
+            if queue:
+                self._queues[owner] = queue
+            self._trim(queue, self.max_per_owner)
+
+            while self._queued > self.max_queued:
+                longest = max(self._queues.values(), key=len)
+                if len(longest) > 1:
+                    self._trim(longest, len(longest) - 1)
+                else:
+                    # one id per session left: the page shown longest goes
+                    self._trim(self._queues.popitem(last=False)[1], 0)
+            self._ready.notify_all()
+
+    def _trim(self, queue, limit):
+        while len(queue) > limit:
+            queue.pop()
+            self._queued -= 1
+            self.stats["dropped"] += 1
+
+    def cancel(self, owner):
+        # drop the owner's queued ids; fetches already running complete
+        with self._ready:
+            queue = self._queues.pop(owner, ())
+            self._queued -= len(queue)
+            self.stats["cancelled"] += len(queue)
+
+    def _next_uncached(self):
+        while True:
+            with self._ready:
+                while not self._queued:
+                    self._ready.wait()
+                # the oldest owner's most likely id; it then goes to the back
+                owner, queue = next(iter(self._queues.items()))
+                movie_id = queue.popleft()
+                self._queued -= 1
+                del self._queues[owner]
+                if queue:
+                    self._queues[owner] = queue
+            if not self.client.has_bundle(movie_id):
+                return movie_id
+            self.stats["cached"] += 1
+
+    def _run(self):
+        while True:
+            # take the token first: ids cancelled while waiting for it are
+            # never fetched
+            self.budget.acquire()
+            movie_id = self._next_uncached()
+            try:
+                self.client.movie_bundle(movie_id)
+                self.stats["fetched"] += 1
+            except Exception as e:
+                print("TMDB PREFETCH ERROR:", movie_id, e)
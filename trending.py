@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes may overlap, each write is still atomic
+    fcntl = None
+
+from tmdb_client import BASE_DIR, HOUR
+
+# --------------------------------------------------
+# TRENDING SNAPSHOT
+# --------------------------------------------------
+# TMDB's weekly trending list changes at most daily, but the app used to
+# ask for it at the top of every script run. A background thread now
+# refreshes a local snapshot (ids, titles, poster paths) on a schedule and
+# renders only read it from memory: no network I/O, whatever TMDB's state.
+#
+# The snapshot is a JSON file shared by every Streamlit worker on the
+# host. Only one of them needs to refresh it: workers take a lock file
+# before refreshing, and whoever gets it after another worker finds the
+# snapshot fresh and does nothing. The others see the new file's mtime
+# and reload it. A failed refresh leaves the last good snapshot in place
+# and is retried sooner.
+
+TRENDING_PATH = os.environ.get("TRENDING_PATH", os.path.join(BASE_DIR, "cache", "trending.json"))
+TRENDING_ENDPOINT = "trending/movie/week"
+
+REFRESH_INTERVAL = 6 * HOUR
+RETRY_INTERVAL = 5 * 60  # after a failed refresh
+CHECK_INTERVAL = 60  # seconds between looks at the snapshot's age
+
+
+def snapshot_from_response(data):
+    movies = [
+        {
+            "id": movie.get("id"),
+            "title": movie.get("title"),
+            "poster_path": movie.get("poster_path"),
+        }
+        for movie in (data or {}).get("results", [])
+        if movie.get("title")
+    ]
+    return {"fetched_at": time.time(), "movies": movies}
+
+
+class TrendingService:
+    def __init__(
+        self,
+        client,
+        path=TRENDING_PATH,
+        refresh_interval=REFRESH_INTERVAL,
+        retry_interval=RETRY_INTERVAL,
+        check_interval=CHECK_INTERVAL,
+    ):
+        self.client = client
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+        self._snapshot = {"fetched_at": 0, "movies": []}
+        self._mtime = None
+        self._next_attempt = 0.0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._reload()
+
+    def start(self):
+        threading.Thread(target=self._run, name="trending-refresh", daemon=True).start()
+        return self
+
+    def movies(self, limit=None):
+        # the current snapshot's movies; never touches the network
+        self._reload()
+        return self._snapshot["movies"][:limit]
+
+    def _reload(self):
+        # pick up a snapshot written by this or another process
+        try:
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                # e.g. a file from an older layout; the next refresh replaces it
+                print("TRENDING SNAPSHOT ERROR:", e)
+                return
+            self._snapshot = snapshot
+            self._mtime = mtime
+
+    def _due(self):
+        return time.time() - self._snapshot["fetched_at"] >= self.refresh_interval
+
+    def refresh(self):
+        # fetch and store a new snapshot unless another worker just did;
+        # keeps the old one on failure
+        with open(self.path + ".lock", "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._reload()
+            if not self._due():
+                return True
+
+            snapshot = snapshot_from_response(self.client.get(TRENDING_ENDPOINT))
+            if not snapshot["movies"]:
+                print("TRENDING REFRESH FAILED: keeping snapshot from", self._snapshot["fetched_at"])
+                return False
+
+            # a temp file of our own, so concurrent writers never share one
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(snapshot, f)
+                os.chmod(tmp, 0o644)  # mkstemp creates it owner-only
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.remove(tmp)
+                raise
+            self._reload()
+            return True
+
+    def _run(self):
+        while True:
+            self._reload()
+            now = time.time()
+            if self._due() and now >= self._next_attempt:
+                try:
+                    ok = self.refresh()
+                except Exception as e:
+                    print("TRENDING REFRESH ERROR:", e)
+                    ok = False
+                if not ok:
+                    self._next_attempt = now + self.retry_interval
+            time.sleep(self.check_interval)